@@ -1,6 +1,9 @@
 import os
 import re
 import json
+import hashlib
+import warnings
+import itertools
 import torch
 import librosa
 import soundfile
@@ -14,17 +17,80 @@ import utils
 import commons
 from models import SynthesizerTrn
 from split_utils import split_sentence
+from text.cleaner import normalize_text
+from frontend_cache import symbols_hash
+from quantization import quantize_dynamic_int8
+from text import bert_model_id
 from mel_processing import spectrogram_torch, spectrogram_torch_conv
 from download_utils import load_or_download_config, load_or_download_model
 
+
+def parse_cpu_list(cpus):
+    """'0-3,8' -> [0, 1, 2, 3, 8]"""
+    cores = []
+    for part in str(cpus).split(','):
+        if '-' in part:
+            start, end = part.split('-')
+            cores.extend(range(int(start), int(end) + 1))
+        elif part.strip():
+            cores.append(int(part))
+    return cores
+
+
+def cpu_supports_bf16():
+    # without AVX512/AMX bf16 kernels CPU autocast falls back to slow
+    # reference code and runs slower than fp32
+    try:
+        return torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def configure_threads(num_threads=None, num_interop_threads=None, cpu_affinity=None):
+    """Process-wide torch thread counts and CPU pinning (Linux only).
+
+    cpu_affinity is a list of core ids or a string such as '0-3,8'. Without
+    num_threads, pinning also caps the intra-op threads at the pinned cores.
+    The inter-op pool can only be sized before torch first uses it.
+    """
+    if cpu_affinity is not None:
+        cores = parse_cpu_list(cpu_affinity) if isinstance(cpu_affinity, str) else list(cpu_affinity)
+        os.sched_setaffinity(0, cores)
+        if num_threads is None:
+            num_threads = len(cores)
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads is not None and torch.get_num_interop_threads() != num_interop_threads:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError as e:
+            print(f"could not set interop threads to {num_interop_threads}: {e}")
+
+
 class TTS(nn.Module):
     def __init__(self, 
                 language,
                 device='auto',
                 use_hf=True,
                 config_path=None,
-                ckpt_path=None):
+                ckpt_path=None,
+                inference_only=False,
+                mmap=False,
+                frontend_cache=None,
+                audio_cache=None,
+                num_threads=None,
+                num_interop_threads=None,
+                cpu_affinity=None,
+                quantize=None,
+                dtype=None):
         super().__init__()
+        assert quantize in [None, 'int8'], quantize
+        assert dtype in [None, 'fp32', 'bf16', 'fp16'], dtype
+        # dynamically quantized layers only take fp32 inputs, autocast would feed them bf16/fp16
+        assert not (quantize and dtype in ['bf16', 'fp16']), "quantize='int8' runs in fp32, drop dtype"
+        # torch threading is per process; set it before any work so several
+        # instances or workers on one host can split the cores between them
+        configure_threads(num_threads, num_interop_threads, cpu_affinity)
         if device == 'auto':
             device = 'cpu'
             if torch.cuda.is_available(): device = 'cuda'
@@ -53,24 +119,98 @@ class TTS(nn.Module):
         model.eval()
         self.model = model
         self.symbol_to_id = {s: i for i, s in enumerate(symbols)}
+        self.symbols_hash = symbols_hash(symbols)
         self.hps = hps
         self.device = device
+        self.frontend_cache = frontend_cache
+        self.audio_cache = audio_cache
+        self.quantize = quantize
+        # registry copy of the BERT the frontend runs, the int8 one only for
+        # instances that asked for it
+        self.bert_dtype = torch.qint8 if quantize == 'int8' else None
+        self._model_hash = None
     
         # load state_dict
-        checkpoint_dict = load_or_download_model(language, device, use_hf=use_hf, ckpt_path=ckpt_path)
-        self.model.load_state_dict(checkpoint_dict['model'], strict=True)
+        checkpoint_dict = load_or_download_model(language, device, use_hf=use_hf, ckpt_path=ckpt_path, mmap=mmap)
+        # memory-mapped weights are used in place, so the pages stay shared
+        # between every process that loads the same file
+        assign = checkpoint_dict.get('mmap', False) and device == 'cpu' and not checkpoint_dict.get('fp16', False)
+        if assign and not checkpoint_dict.get('inference_only', False):
+            # prepare_for_inference replaces every weight-normed weight with
+            # a private folded copy, i.e. the whole decoder and the flows
+            warnings.warn("mmap=True on a training checkpoint only shares the weights that do not use "
+                          "weight norm between processes, export it with export_inference.py to share all of them")
+        if checkpoint_dict.get('inference_only', False):
+            # exported by export_inference.py: no enc_q, weight norm folded
+            self.model.strip_for_inference()
+            self.model.load_state_dict(checkpoint_dict['model'], strict=True, assign=assign)
+        else:
+            self.model.load_state_dict(checkpoint_dict['model'], strict=True, assign=assign)
+            if inference_only:
+                self.model.strip_for_inference()
+        del checkpoint_dict
+        self.prepare_for_inference()
         
         language = language.split('_')[0]
         self.language = 'ZH_MIX_EN' if language == 'ZH' else language # we support a ZH_MIX_EN model
 
+        # reduced precision autocast for enc_p, flow and dec; durations and
+        # the sdp splines stay in fp32. CPU autocast needs bf16
+        if dtype in ['bf16', 'fp16']:
+            assert not (dtype == 'fp16' and device == 'cpu'), "use dtype='bf16' on CPU"
+            assert not (dtype == 'bf16' and device == 'cpu' and not cpu_supports_bf16()), "this CPU has no native bf16 support, use fp32"
+            self.model.autocast_dtype = torch.bfloat16 if dtype == 'bf16' else torch.float16
+        self.dtype = dtype
+
+        if quantize == 'int8':
+            assert device == 'cpu', "int8 dynamic quantization runs on CPU only"
+            quantize_dynamic_int8(self.model)
+            if not getattr(hps.data, 'disable_bert', False):
+                from text import bert_registry
+                # a separate registry entry, fp32 instances keep the float BERT
+                bert_registry.preload(bert_model_id(self.language), device, self.bert_dtype)
+
+    def prepare_for_inference(self):
+        # fold weight_g/weight_v into plain weights once, instead of
+        # recomputing them on every forward pass of the decoder and flows
+        self.model.remove_weight_norm()
+
     @staticmethod
-    def audio_numpy_concat(segment_data_list, sr, speed=1.):
-        audio_segments = []
+    def audio_numpy_concat(segment_data_list, sr, speed=1., out=None):
+        """Joins segments, each followed by 0.05 s of silence, into one float32 array.
+
+        The total length is computed up front and every segment is copied
+        once into a single buffer. out, if given, is a caller-provided
+        float32 buffer of at least that length; the filled prefix is returned.
+        """
+        silence = int((sr * 0.05) / speed)
+        total = sum(segment_data.size for segment_data in segment_data_list) + silence * len(segment_data_list)
+        if out is None:
+            out = np.zeros(total, dtype=np.float32)
+        else:
+            assert out.dtype == np.float32 and out.size >= total, (out.dtype, out.size, total)
+        offset = 0
         for segment_data in segment_data_list:
-            audio_segments += segment_data.reshape(-1).tolist()
-            audio_segments += [0] * int((sr * 0.05) / speed)
-        audio_segments = np.array(audio_segments).astype(np.float32)
-        return audio_segments
+            n = segment_data.size
+            out[offset:offset + n] = segment_data.reshape(-1)
+            out[offset + n:offset + n + silence] = 0
+            offset += n + silence
+        return out[:total]
+
+    @staticmethod
+    def audio_write_segments(segment_data_list, sink, sr, speed=1.):
+        """Streams segments with the same silences as audio_numpy_concat into sink.
+
+        sink is anything with a write method taking a float32 array, such as
+        a soundfile.SoundFile or a binary file. Returns the samples written.
+        """
+        silence = np.zeros(int((sr * 0.05) / speed), dtype=np.float32)
+        total = 0
+        for segment_data in segment_data_list:
+            sink.write(np.ascontiguousarray(segment_data.reshape(-1), dtype=np.float32))
+            sink.write(silence)
+            total += segment_data.size + silence.size
+        return total
 
     @staticmethod
     def split_sentences_into_pieces(text, language, quiet=False):
@@ -81,53 +221,219 @@ class TTS(nn.Module):
             print(" > ===========================")
         return texts
 
-    def tts_to_file(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False,):
+    def tts_to_file(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False, batch_size=1, seed=None):
         language = self.language
+        cache_key = None
+        if self.audio_cache is not None and self.is_deterministic(sdp_ratio, noise_scale, noise_scale_w, seed):
+            cache_key = self.audio_cache.key(self.model_hash, language, text, speaker_id, speed, sdp_ratio, noise_scale, noise_scale_w, seed)
+            audio = self.audio_cache.get(cache_key)
+            if audio is not None:
+                return self.save_audio(audio, output_path, format=format)
         texts = self.split_sentences_into_pieces(text, language, quiet)
+        if batch_size > 1:
+            audio_list = self.infer_batched(texts, speaker_id, batch_size=batch_size, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, pbar=pbar, position=position, quiet=quiet, seed=seed)
+            return self.write_audio(audio_list, output_path, speed=speed, format=format, cache_key=cache_key)
         audio_list = []
+        items = list(zip(texts, self.get_text_inputs(texts), self.sentence_generators(seed, len(texts))))
         if pbar:
-            tx = pbar(texts)
+            tx = pbar(items)
         else:
             if position:
-                tx = tqdm(texts, position=position)
+                tx = tqdm(items, position=position)
             elif quiet:
-                tx = texts
+                tx = items
             else:
-                tx = tqdm(texts)
-        for t in tx:
-            if language in ['EN', 'ZH_MIX_EN']:
-                t = re.sub(r'([a-z])([A-Z])', r'\1 \2', t)
-            device = self.device
-            bert, ja_bert, phones, tones, lang_ids = utils.get_text_for_tts_infer(t, language, self.hps, device, self.symbol_to_id)
-            print(t,phones)
+                tx = tqdm(items)
+        for t, text_inputs, generator in tx:
+            if not quiet:
+                print(t, text_inputs[2])
+            audio_list.append(self.infer_text_inputs(text_inputs, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, generator=generator))
+        torch.cuda.empty_cache()
+        return self.write_audio(audio_list, output_path, speed=speed, format=format, cache_key=cache_key)
+
+    @staticmethod
+    def is_deterministic(sdp_ratio, noise_scale, noise_scale_w, seed=None):
+        # with a seed, or no noise left in the prior or the duration
+        # predictor, the same inputs always give the same waveform
+        if seed is not None:
+            return True
+        return noise_scale == 0 and (sdp_ratio == 0 or noise_scale_w == 0)
+
+    @staticmethod
+    def sentence_generators(seed, n):
+        """One CPU generator per sentence, seeded with seed + index.
+
+        Noise depends only on the seed and the sentence position, so the
+        same text gives the same audio on any device and batch_size.
+        """
+        if seed is None:
+            return [None] * n
+        return [torch.Generator().manual_seed(seed + i) for i in range(n)]
+
+    @property
+    def model_hash(self):
+        if self._model_hash is None:
+            h = hashlib.sha1()
+            h.update(repr(self.model.autocast_dtype).encode('utf-8'))
+            # quantize='int8' also swaps in the int8 BERT, whose features differ
+            h.update(repr(self.quantize).encode('utf-8'))
+            for name, value in self.model.state_dict().items():
+                h.update(name.encode('utf-8'))
+                # quantized layers store packed (weight, bias) tuples and dtypes
+                values = value if isinstance(value, tuple) else (value,)
+                for tensor in values:
+                    if not torch.is_tensor(tensor):
+                        h.update(repr(tensor).encode('utf-8'))
+                        continue
+                    if tensor.is_quantized:
+                        tensor = tensor.int_repr()
+                    h.update(tensor.detach().cpu().contiguous().flatten().view(torch.uint8).numpy().tobytes())
+            self._model_hash = h.hexdigest()
+        return self._model_hash
+
+    def get_text_inputs(self, texts, bert_batch_size=16):
+        """Frontend for a list of sentences, with BERT run on padded groups.
+
+        With a frontend_cache, sentences are normalized first and only the
+        ones missing from the cache go through g2p and BERT.
+        """
+        language = self.language
+        if language in ['EN', 'ZH_MIX_EN']:
+            texts = [re.sub(r'([a-z])([A-Z])', r'\1 \2', t) for t in texts]
+        cache = self.frontend_cache
+        if cache is not None:
+            texts = [normalize_text(t, language) for t in texts]
+            disable_bert = getattr(self.hps.data, "disable_bert", False)
+            model_id = None if disable_bert else bert_model_id(language)
+            keys = [cache.key(language, self.symbols_hash, self.hps.data.add_blank, disable_bert, model_id, self.quantize, t) for t in texts]
+            items = [cache.get(key) for key in keys]
+        else:
+            items = [None] * len(texts)
+
+        missing = [i for i, item in enumerate(items) if item is None]
+        for start in range(0, len(missing), bert_batch_size):
+            batch = missing[start:start + bert_batch_size]
+            results = utils.get_text_for_tts_infer_batch([texts[i] for i in batch], language, self.hps, self.device, self.symbol_to_id, normalized=cache is not None, bert_dtype=self.bert_dtype)
+            for i, item in zip(batch, results):
+                items[i] = item
+                if cache is not None:
+                    cache.put(keys[i], item)
+        return items
+
+    def cache_stats(self):
+        stats = {}
+        if self.frontend_cache is not None:
+            stats['frontend'] = self.frontend_cache.stats()
+        if self.audio_cache is not None:
+            stats['audio'] = self.audio_cache.stats()
+        return stats
+
+    def infer_sentence(self, t, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, generator=None):
+        text_inputs = self.get_text_inputs([t])[0]
+        return self.infer_text_inputs(text_inputs, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, generator=generator)
+
+    def infer_sentence_stream(self, t, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, generator=None, chunk_size=64):
+        text_inputs = self.get_text_inputs([t])[0]
+        return self.infer_text_inputs_stream(text_inputs, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, generator=generator, chunk_size=chunk_size)
+
+    def infer_text_inputs_stream(self, text_inputs, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, generator=None, chunk_size=64):
+        """Yields one sentence's waveform in pieces of chunk_size latent frames.
+
+        Joined, the pieces equal infer_text_inputs for the same generator.
+        """
+        device = self.device
+        bert, ja_bert, phones, tones, lang_ids = text_inputs
+        pieces = self.model.infer_stream(
+                phones.to(device).unsqueeze(0),
+                torch.LongTensor([phones.size(0)]).to(device),
+                torch.LongTensor([speaker_id]).to(device),
+                tones.to(device).unsqueeze(0),
+                lang_ids.to(device).unsqueeze(0),
+                bert.to(device).unsqueeze(0),
+                ja_bert.to(device).unsqueeze(0),
+                chunk_size=chunk_size,
+                sdp_ratio=sdp_ratio,
+                noise_scale=noise_scale,
+                noise_scale_w=noise_scale_w,
+                length_scale=1. / speed,
+                generator=generator,
+            )
+        while True:
+            # no_grad per step, so it does not leak to the caller between yields
             with torch.no_grad():
-                x_tst = phones.to(device).unsqueeze(0)
-                tones = tones.to(device).unsqueeze(0)
-                lang_ids = lang_ids.to(device).unsqueeze(0)
-                bert = bert.to(device).unsqueeze(0)
-                ja_bert = ja_bert.to(device).unsqueeze(0)
-                x_tst_lengths = torch.LongTensor([phones.size(0)]).to(device)
-                del phones
-                speakers = torch.LongTensor([speaker_id]).to(device)
-                audio = self.model.infer(
-                        x_tst,
-                        x_tst_lengths,
-                        speakers,
-                        tones,
-                        lang_ids,
-                        bert,
-                        ja_bert,
-                        sdp_ratio=sdp_ratio,
-                        noise_scale=noise_scale,
-                        noise_scale_w=noise_scale_w,
-                        length_scale=1. / speed,
-                    )[0][0, 0].data.cpu().float().numpy()
-                del x_tst, tones, lang_ids, bert, ja_bert, x_tst_lengths, speakers
-                # 
-            audio_list.append(audio)
+                o = next(pieces, None)
+            if o is None:
+                return
+            yield o[0, 0].data.cpu().float().numpy()
+
+    def infer_text_inputs(self, text_inputs, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, generator=None):
+        device = self.device
+        bert, ja_bert, phones, tones, lang_ids = text_inputs
+        with torch.no_grad():
+            x_tst = phones.to(device).unsqueeze(0)
+            tones = tones.to(device).unsqueeze(0)
+            lang_ids = lang_ids.to(device).unsqueeze(0)
+            bert = bert.to(device).unsqueeze(0)
+            ja_bert = ja_bert.to(device).unsqueeze(0)
+            x_tst_lengths = torch.LongTensor([phones.size(0)]).to(device)
+            del phones
+            speakers = torch.LongTensor([speaker_id]).to(device)
+            audio = self.model.infer(
+                    x_tst,
+                    x_tst_lengths,
+                    speakers,
+                    tones,
+                    lang_ids,
+                    bert,
+                    ja_bert,
+                    sdp_ratio=sdp_ratio,
+                    noise_scale=noise_scale,
+                    noise_scale_w=noise_scale_w,
+                    length_scale=1. / speed,
+                    generator=generator,
+                )[0][0, 0].data.cpu().float().numpy()
+            del x_tst, tones, lang_ids, bert, ja_bert, x_tst_lengths, speakers
+            # 
+        return audio
+
+    def tts_stream(self, text, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, format='float32', quiet=True, seed=None, chunk_size=None):
+        """Yields audio sentence by sentence as soon as each one is synthesized.
+
+        Every sentence is followed by the same 0.05 s of silence that
+        audio_numpy_concat inserts, so joining the chunks reproduces the
+        tts_to_file output. format is 'float32' for numpy float32 samples
+        or 'pcm16' for little-endian 16-bit PCM bytes. With chunk_size,
+        each sentence is also vocoded and yielded chunk_size latent frames
+        at a time, so the first audio arrives before the sentence is done.
+        """
+        assert format in ['float32', 'pcm16'], format
+        texts = self.split_sentences_into_pieces(text, self.language, quiet)
+        for t, generator in zip(texts, self.sentence_generators(seed, len(texts))):
+            yield from self.iter_sentence_chunks(t, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, format=format, generator=generator, chunk_size=chunk_size)
         torch.cuda.empty_cache()
+
+    def iter_sentence_chunks(self, t, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, format='float32', generator=None, chunk_size=None):
+        """One sentence of tts_stream: its audio, in pieces with chunk_size, then the silence after it."""
+        if chunk_size:
+            pieces = self.infer_sentence_stream(t, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, generator=generator, chunk_size=chunk_size)
+        else:
+            pieces = [self.infer_sentence(t, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, generator=generator)]
+        silence = np.zeros(int((self.hps.data.sampling_rate * 0.05) / speed), dtype=np.float32)
+        for chunk in itertools.chain((piece.reshape(-1).astype(np.float32) for piece in pieces), [silence]):
+            if format == 'pcm16':
+                chunk = (np.clip(chunk, -1., 1.) * 32767).astype('<i2').tobytes()
+            yield chunk
+
+    def sentence_chunks(self, *args, **kwargs):
+        return list(self.iter_sentence_chunks(*args, **kwargs))
+
+    def write_audio(self, audio_list, output_path=None, speed=1.0, format=None, cache_key=None):
         audio = self.audio_numpy_concat(audio_list, sr=self.hps.data.sampling_rate, speed=speed)
+        if cache_key is not None:
+            audio = self.audio_cache.put(cache_key, audio)
+        return self.save_audio(audio, output_path, format=format)
 
+    def save_audio(self, audio, output_path=None, format=None):
         if output_path is None:
             return audio
         else:
@@ -136,6 +442,88 @@ class TTS(nn.Module):
             else:
                 soundfile.write(output_path, audio, self.hps.data.sampling_rate)
 
+    @staticmethod
+    def collate_text_batch(items):
+        """Right-pads per-sentence frontend outputs into one batch.
+
+        items: list of (bert, ja_bert, phones, tones, lang_ids) as returned
+        by utils.get_text_for_tts_infer
+        """
+        x_lengths = torch.LongTensor([item[2].size(0) for item in items])
+        b, t_max = len(items), int(x_lengths.max())
+        bert = torch.zeros(b, items[0][0].size(0), t_max)
+        ja_bert = torch.zeros(b, items[0][1].size(0), t_max)
+        phones = torch.zeros(b, t_max, dtype=torch.long)
+        tones = torch.zeros(b, t_max, dtype=torch.long)
+        lang_ids = torch.zeros(b, t_max, dtype=torch.long)
+        for i, (item_bert, item_ja_bert, item_phones, item_tones, item_lang_ids) in enumerate(items):
+            length = item_phones.size(0)
+            bert[i, :, :length] = item_bert
+            ja_bert[i, :, :length] = item_ja_bert
+            phones[i, :length] = item_phones
+            tones[i, :length] = item_tones
+            lang_ids[i, :length] = item_lang_ids
+        return bert, ja_bert, phones, tones, lang_ids, x_lengths
+
+    def infer_batched(self, texts, speaker_id, batch_size=8, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, position=None, quiet=False, seed=None):
+        """Synthesizes sentences in padded groups of up to batch_size.
+
+        Sentences are grouped by phone length to keep padding small and the
+        waveforms are returned in the original order, each cut back to its
+        own y_mask length. With a seed every sentence draws its own noise,
+        so the output matches the sequential path.
+        """
+        items = self.get_text_inputs(texts)
+        generators = self.sentence_generators(seed, len(texts))
+
+        order = sorted(range(len(items)), key=lambda i: items[i][2].size(0))
+        batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+        if pbar:
+            bx = pbar(batches)
+        else:
+            if position:
+                bx = tqdm(batches, position=position)
+            elif quiet:
+                bx = batches
+            else:
+                bx = tqdm(batches)
+
+        audio_list = [None] * len(items)
+        for batch in bx:
+            batch_generators = [generators[i] for i in batch] if seed is not None else None
+            batch_audio = self.infer_text_batch([items[i] for i in batch], speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, generators=batch_generators)
+            for i, audio in zip(batch, batch_audio):
+                audio_list[i] = audio
+        torch.cuda.empty_cache()
+        return audio_list
+
+    def infer_text_batch(self, items, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, generators=None):
+        """One padded infer over frontend outputs; returns each item's waveform."""
+        device = self.device
+        hop_length = self.hps.data.hop_length
+        bert, ja_bert, x_tst, tones, lang_ids, x_tst_lengths = self.collate_text_batch(items)
+        with torch.no_grad():
+            speakers = torch.LongTensor([speaker_id] * len(items)).to(device)
+            o, _, y_mask, _ = self.model.infer(
+                    x_tst.to(device),
+                    x_tst_lengths.to(device),
+                    speakers,
+                    tones.to(device),
+                    lang_ids.to(device),
+                    bert.to(device),
+                    ja_bert.to(device),
+                    sdp_ratio=sdp_ratio,
+                    noise_scale=noise_scale,
+                    noise_scale_w=noise_scale_w,
+                    length_scale=1. / speed,
+                    generator=generators,
+                )
+            y_lengths = y_mask.sum([1, 2]).long().cpu()
+            o = o.data.cpu().float()
+            audio_list = [o[j, 0, :int(y_lengths[j]) * hop_length].numpy() for j in range(len(items))]
+            del bert, ja_bert, x_tst, tones, lang_ids, x_tst_lengths, speakers, o, y_mask
+        return audio_list
+
     def tts_to_file_multiple_spk(self, text, speakers, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False,):
         language = self.language
         texts = self.split_sentences_into_pieces(text, language, quiet)
@@ -153,7 +541,7 @@ class TTS(nn.Module):
             if language in ['EN', 'ZH_MIX_EN']:
                 t = re.sub(r'([a-z])([A-Z])', r'\1 \2', t)
             device = self.device
-            bert, ja_bert, phones, tones, lang_ids = utils.get_text_for_tts_infer(t, language, self.hps, device, self.symbol_to_id)
+            bert, ja_bert, phones, tones, lang_ids = utils.get_text_for_tts_infer(t, language, self.hps, device, self.symbol_to_id, bert_dtype=self.bert_dtype)
             print(t,phones)
             with torch.no_grad():
                 x_tst = phones.to(device).unsqueeze(0)
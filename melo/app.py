@@ -4,20 +4,19 @@ import gradio as gr
 import os, torch, io
 # os.system('python -m unidic download')
 print("Make sure you've downloaded unidic (python -m unidic download) for this WebUI to work.")
-from api import TTS
+from model_pool import ModelPool
 speed = 1.0
 import tempfile
 import click
 device = 'auto'
-models = {
-    'EN': TTS(language='EN', device=device),
-    'ES': TTS(language='ES', device=device),
-    'FR': TTS(language='FR', device=device),
-    'ZH': TTS(language='ZH', device=device),
-    'JP': TTS(language='JP', device=device),
-    'KR': TTS(language='KR', device=device),
-}
-speaker_ids = models['EN'].hps.data.spk2id
+# languages load on first use; at most MELO_MAX_MODELS stay resident and
+# MELO_HOT_LANGUAGES (comma separated) are loaded in the background at startup
+models = ModelPool(
+    max_models=int(os.environ.get('MELO_MAX_MODELS', 2)),
+    hot=[l for l in os.environ.get('MELO_HOT_LANGUAGES', '').split(',') if l],
+    device=device,
+)
+speaker_ids = models.get('EN').hps.data.spk2id
 
 default_text_dict = {
     'EN': 'The field of text-to-speech has seen rapid development recently.',
@@ -30,14 +29,16 @@ default_text_dict = {
     
 def synthesize(speaker, text, speed, language, progress=gr.Progress()):
     bio = io.BytesIO()
-    models[language].tts_to_file(text, models[language].hps.data.spk2id[speaker], bio, speed=speed, pbar=progress.tqdm, format='wav')
+    tts = models.get(language)
+    tts.tts_to_file(text, tts.hps.data.spk2id[speaker], bio, speed=speed, pbar=progress.tqdm, format='wav')
     return bio.getvalue()
 def load_speakers(language, text):
     if text in list(default_text_dict.values()):
         newtext = default_text_dict[language]
     else:
         newtext = text
-    return gr.update(value=list(models[language].hps.data.spk2id.keys())[0], choices=list(models[language].hps.data.spk2id.keys())), newtext
+    spk2id = models.get(language).hps.data.spk2id
+    return gr.update(value=list(spk2id.keys())[0], choices=list(spk2id.keys())), newtext
 with gr.Blocks() as demo:
     gr.Markdown('# MeloTTS WebUI\n\nA WebUI for MeloTTS.')
     with gr.Group():
@@ -0,0 +1,129 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from api import TTS
+
+# the model of a process pool worker, built once by _init_worker
+_worker_tts = None
+
+
+def _init_worker(tts_kwargs):
+    global _worker_tts
+    _worker_tts = TTS(**tts_kwargs)
+
+
+def _synthesize(text, speaker_id, output_path, kwargs, tts=None):
+    tts = tts or _worker_tts
+    return tts.tts_to_file(text, speaker_id, output_path, quiet=True, **kwargs)
+
+
+def _sentence_chunks(t, speaker_id, seed, kwargs, tts=None):
+    return list(_iter_sentence_chunks(t, speaker_id, seed, kwargs, tts=tts))
+
+
+def _iter_sentence_chunks(t, speaker_id, seed, kwargs, tts=None):
+    tts = tts or _worker_tts
+    generator = TTS.sentence_generators(seed, 1)[0]
+    return tts.iter_sentence_chunks(t, speaker_id, generator=generator, **kwargs)
+
+
+def _next_chunk(chunks, tts=None):
+    return next(chunks, None)
+
+
+class AsyncTTS:
+    """Asyncio front end to TTS that keeps the event loop free.
+
+    The frontend and the model run in a pool of max_workers threads sharing
+    one TTS, or with executor='process' in worker processes that each load
+    their own. At most max_pending jobs are handed to the pool at a time,
+    the rest wait on the event loop, and every stream synthesizes at most
+    prefetch sentences ahead of its reader.
+
+        async with AsyncTTS(language='EN') as tts:
+            audio = await tts.synthesize(text, speaker_id)
+            async for chunk in tts.stream(text, speaker_id, format='pcm16'):
+                ...
+    """
+
+    def __init__(self, tts=None, executor='thread', max_workers=1, max_pending=64, prefetch=2, **tts_kwargs):
+        assert executor in ['thread', 'process'], executor
+        if executor == 'process':
+            assert tts is None, "process workers load their own model from tts_kwargs"
+            self.tts = None
+            self.language = tts_kwargs['language']
+            self.executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(tts_kwargs,),
+            )
+        else:
+            self.tts = tts if tts is not None else TTS(**tts_kwargs)
+            self.language = self.tts.language
+            self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tts')
+        self.max_pending = max_pending
+        self.prefetch = prefetch
+        self.slots = asyncio.Semaphore(max_pending)
+
+    async def run(self, fn, *args):
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, tts=self.tts))
+
+    async def synthesize(self, text, speaker_id, output_path=None, **kwargs):
+        """Same as TTS.tts_to_file; returns the float32 audio without output_path."""
+        return await self.run(_synthesize, text, speaker_id, output_path, kwargs)
+
+    async def stream(self, text, speaker_id, format='float32', seed=None, chunk_size=None, **kwargs):
+        """Same chunks as TTS.tts_stream, sentence by sentence.
+
+        With chunk_size, thread workers hand over each vocoder window as it
+        is decoded. Process workers cannot share a generator, so they still
+        return a sentence's windows together.
+        """
+        assert format in ['float32', 'pcm16'], format
+        texts = TTS.split_sentences_into_pieces(text, self.language, quiet=True)
+        kwargs.update(format=format, chunk_size=chunk_size)
+        queue = asyncio.Queue(maxsize=self.prefetch)
+
+        async def produce():
+            try:
+                for i, t in enumerate(texts):
+                    sentence_seed = None if seed is None else seed + i
+                    if chunk_size and self.tts is not None:
+                        chunks = _iter_sentence_chunks(t, speaker_id, sentence_seed, kwargs, tts=self.tts)
+                        while True:
+                            chunk = await self.run(_next_chunk, chunks)
+                            if chunk is None:
+                                break
+                            await queue.put([chunk])
+                    else:
+                        await queue.put(await self.run(_sentence_chunks, t, speaker_id, sentence_seed, kwargs))
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                chunks = await queue.get()
+                if chunks is None:
+                    break
+                if isinstance(chunks, Exception):
+                    raise chunks
+                for chunk in chunks:
+                    yield chunk
+        finally:
+            producer.cancel()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
@@ -0,0 +1,109 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class AudioCache:
+    """Caches synthesized waveforms for deterministic synthesis settings.
+
+    Entries are keyed by a hash of the model and every synthesis parameter.
+    The memory tier is bounded by max_bytes and evicts the least recently
+    ('lru') or least frequently ('lfu') used entry. With cache_dir set,
+    waveforms are also stored as .npy files and memory-mapped back on a
+    memory miss. Returned arrays are read-only and shared, copy them
+    before modifying.
+    """
+
+    def __init__(self, max_bytes=512 * 2**20, cache_dir=None, policy='lru'):
+        assert policy in ['lru', 'lfu'], policy
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.policy = policy
+        self.entries = OrderedDict()
+        self.counts = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(*fields):
+        return hashlib.sha1("\x1f".join(repr(f) for f in fields).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.counts[key] += 1
+                self.hits += 1
+                return self.entries[key]
+        audio = self.load(key)
+        with self.lock:
+            if audio is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.insert(key, audio)
+        return audio
+
+    def put(self, key, audio):
+        audio = np.array(audio, dtype=np.float32)
+        audio.setflags(write=False)
+        with self.lock:
+            self.insert(key, audio)
+        self.save(key, audio)
+        return audio
+
+    def insert(self, key, audio):
+        if key in self.entries:
+            self.nbytes -= self.entries.pop(key).nbytes
+        if audio.nbytes > self.max_bytes:
+            self.counts.pop(key, None)
+            return
+        self.entries[key] = audio
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.nbytes += audio.nbytes
+        while self.nbytes > self.max_bytes:
+            if self.policy == 'lfu':
+                # ties go to the least recently used entry
+                evict = min(self.entries, key=self.counts.__getitem__)
+            else:
+                evict = next(iter(self.entries))
+            self.nbytes -= self.entries.pop(evict).nbytes
+            del self.counts[evict]
+
+    def shard_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".npy")
+
+    def save(self, key, audio):
+        if self.cache_dir is None:
+            return
+        path = self.shard_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, audio)
+        os.replace(tmp_path, path)
+
+    def load(self, key):
+        if self.cache_dir is None:
+            return None
+        path = self.shard_path(key)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "bytes": self.nbytes,
+            }
@@ -0,0 +1,187 @@
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+from api import TTS
+
+
+class Request:
+    __slots__ = ('text_inputs', 'speaker_id', 'params', 'generator', 'future', 'arrival')
+
+    def __init__(self, text_inputs, speaker_id, params, generator):
+        self.text_inputs = text_inputs
+        self.speaker_id = speaker_id
+        self.params = params
+        self.generator = generator
+        self.future = Future()
+        self.arrival = time.perf_counter()
+
+    @property
+    def length(self):
+        return self.text_inputs[2].size(0)
+
+
+class BatchScheduler:
+    """Batches sentences from concurrent callers into padded infer calls.
+
+    A background thread collects sentences for up to max_wait_ms after the
+    oldest pending one arrives, or until a group fills max_batch_size.
+    Sentences are grouped by speaker, synthesis parameters, whether they
+    are seeded, and phone-length bucket (bucket_size phones wide). The group
+    of the oldest sentence runs first, capped so that batch size times the
+    longest phone sequence stays within max_padded_len. Each caller gets its
+    waveform through a Future.
+    """
+
+    def __init__(self, tts, max_batch_size=8, max_wait_ms=10, max_padded_len=4096, bucket_size=32, history=1024):
+        self.tts = tts
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_padded_len = max_padded_len
+        self.bucket_size = bucket_size
+        self.requests = queue.Queue()
+        self.pending = []
+        self.lock = threading.Lock()
+        self.queue_delays = deque(maxlen=history)
+        self.batches = 0
+        self.items = 0
+        self.phones = 0
+        self.padded_phones = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.loop, name='tts-batcher', daemon=True)
+        self.thread.start()
+
+    def group_key(self, request):
+        return (
+            request.speaker_id,
+            request.params,
+            request.generator is not None,
+            request.length // self.bucket_size,
+        )
+
+    def submit(self, text_inputs, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, generator=None):
+        """Queues one sentence's frontend output; returns a Future of its waveform."""
+        request = Request(text_inputs, speaker_id, (sdp_ratio, noise_scale, noise_scale_w, speed), generator)
+        self.requests.put(request)
+        return request.future
+
+    def synthesize(self, text, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, seed=None, quiet=True):
+        """Blocking equivalent of TTS.tts_to_file without an output path."""
+        texts = TTS.split_sentences_into_pieces(text, self.tts.language, quiet)
+        items = self.tts.get_text_inputs(texts)
+        generators = TTS.sentence_generators(seed, len(texts))
+        futures = [
+            self.submit(text_inputs, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, generator=generator)
+            for text_inputs, generator in zip(items, generators)
+        ]
+        audio_list = [future.result() for future in futures]
+        return self.tts.audio_numpy_concat(audio_list, sr=self.tts.hps.data.sampling_rate, speed=speed)
+
+    def collect(self):
+        # block for the first request, then keep collecting until the oldest
+        # one has waited max_wait or some group is full; requests already
+        # queued are always taken
+        if not self.pending:
+            request = self.requests.get()
+            if request is None:
+                self.running = False
+                return
+            self.pending.append(request)
+        deadline = self.pending[0].arrival + self.max_wait
+        counts = {}
+        for request in self.pending:
+            key = self.group_key(request)
+            counts[key] = counts.get(key, 0) + 1
+        while max(counts.values()) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                if timeout > 0:
+                    request = self.requests.get(timeout=timeout)
+                else:
+                    request = self.requests.get_nowait()
+            except queue.Empty:
+                return
+            if request is None:
+                self.running = False
+                return
+            self.pending.append(request)
+            key = self.group_key(request)
+            counts[key] = counts.get(key, 0) + 1
+
+    def next_batch(self):
+        key = self.group_key(self.pending[0])
+        batch, rest = [], []
+        t_max = 0
+        for request in self.pending:
+            fits = (
+                len(batch) < self.max_batch_size
+                and (len(batch) + 1) * max(t_max, request.length) <= self.max_padded_len
+            )
+            if self.group_key(request) == key and (fits or not batch):
+                batch.append(request)
+                t_max = max(t_max, request.length)
+            else:
+                rest.append(request)
+        self.pending = rest
+        return batch
+
+    def run(self, batch):
+        start = time.perf_counter()
+        first = batch[0]
+        sdp_ratio, noise_scale, noise_scale_w, speed = first.params
+        generators = [request.generator for request in batch] if first.generator is not None else None
+        try:
+            audio_list = self.tts.infer_text_batch(
+                [request.text_inputs for request in batch],
+                first.speaker_id,
+                sdp_ratio=sdp_ratio,
+                noise_scale=noise_scale,
+                noise_scale_w=noise_scale_w,
+                speed=speed,
+                generators=generators,
+            )
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        with self.lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.phones += sum(request.length for request in batch)
+            self.padded_phones += len(batch) * max(request.length for request in batch)
+            self.queue_delays.extend(start - request.arrival for request in batch)
+        for request, audio in zip(batch, audio_list):
+            request.future.set_result(audio)
+
+    def loop(self):
+        while self.running or self.pending:
+            self.collect()
+            while self.pending:
+                self.run(self.next_batch())
+                if self.running:
+                    break
+        torch.cuda.empty_cache()
+
+    def metrics(self):
+        """Queueing delay percentiles (ms), mean batch fill and padding efficiency."""
+        with self.lock:
+            delays = np.array(self.queue_delays) * 1000
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'batch_fill': self.items / (self.batches * self.max_batch_size) if self.batches else 0.,
+                'padding_efficiency': self.phones / self.padded_phones if self.padded_phones else 0.,
+                'queue_delay_ms': {
+                    f'p{q}': float(np.percentile(delays, q)) if len(delays) else 0.
+                    for q in (50, 95, 99)
+                },
+            }
+
+    def close(self):
+        self.requests.put(None)
+        self.thread.join()
@@ -0,0 +1,321 @@
+import sys
+import time
+import click
+import subprocess
+import numpy as np
+import torch
+
+import utils
+from models import SynthesizerTrn
+
+
+def build_model(config_path, device='cpu'):
+    hps = utils.get_hparams_from_file(config_path)
+    if 'symbols' in hps:
+        symbols = hps.symbols
+    else:
+        from text.symbols import symbols
+    model = SynthesizerTrn(
+        len(symbols),
+        hps.data.filter_length // 2 + 1,
+        hps.train.segment_size // hps.data.hop_length,
+        n_speakers=hps.data.n_speakers,
+        **hps.model,
+    ).to(device)
+    model.eval()
+    return model, hps
+
+
+def timeit(fn, repeats, warmup=2):
+    for _ in range(warmup):
+        fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def memory_usage():
+    """Resident, anonymous (private) and file-backed (shareable) memory in MB."""
+    usage = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'RssAnon', 'RssFile'):
+                usage[key] = int(value.split()[0]) / 1024
+    return usage
+
+
+def mel_distance(reference, audio, hps):
+    """Mean absolute log-mel difference over the frames both waveforms cover."""
+    from mel_processing import mel_spectrogram_torch
+    mels = [
+        mel_spectrogram_torch(
+            torch.from_numpy(y).float().view(1, -1),
+            hps.data.filter_length,
+            hps.data.n_mel_channels,
+            hps.data.sampling_rate,
+            hps.data.hop_length,
+            hps.data.win_length,
+            hps.data.mel_fmin,
+            hps.data.mel_fmax,
+        )
+        for y in (reference, audio)
+    ]
+    frames = min(mel.size(-1) for mel in mels)
+    return (mels[0][..., :frames] - mels[1][..., :frames]).abs().mean().item()
+
+
+TEXTS = [
+    'The field of text-to-speech has seen rapid development recently.',
+    'Did you ever hear a folk tale about a giant turtle?',
+    'Once upon a time there was a small village at the foot of a mountain.',
+]
+
+
+@click.group()
+def main():
+    pass
+
+
+@main.command('load')
+@click.option('--ckpt_path', '-m', required=True, help="checkpoint.pth or .safetensors file")
+@click.option('--config_path', '-c', default=None, help="Model config, defaults to config.json next to the checkpoint")
+@click.option('--mmap', is_flag=True, default=False, help="Memory-map a .pth checkpoint")
+def load(ckpt_path, config_path, mmap):
+    """Startup time and memory of loading one checkpoint on CPU."""
+    import os
+    from download_utils import load_or_download_model
+    if config_path is None:
+        config_path = os.path.join(os.path.dirname(ckpt_path), 'config.json')
+    model, _ = build_model(config_path)
+    before = memory_usage()
+    start = time.perf_counter()
+    checkpoint_dict = load_or_download_model(None, 'cpu', ckpt_path=ckpt_path, mmap=mmap)
+    assign = checkpoint_dict.get('mmap', False) and not checkpoint_dict.get('fp16', False)
+    if checkpoint_dict.get('inference_only', False):
+        model.strip_for_inference()
+    model.load_state_dict(checkpoint_dict['model'], strict=True, assign=assign)
+    del checkpoint_dict
+    # as TTS.prepare_for_inference does; on a training checkpoint this
+    # copies the weight-normed weights out of the mapped file
+    model.remove_weight_norm()
+    elapsed = time.perf_counter() - start
+    after = memory_usage()
+
+    print(f"load time: {elapsed * 1000:.0f} ms")
+    for key in ('VmRSS', 'RssAnon', 'RssFile'):
+        print(f"{key:8s} {after[key]:8.1f} MB ({after[key] - before[key]:+.1f} MB)")
+
+
+@main.command('weight-norm')
+@click.option('--config_path', '-c', default='configs/config.json', help="Model config")
+@click.option('--frames', '-f', default=200, help="Latent frames per sentence")
+@click.option('--repeats', '-r', default=10)
+@click.option('--device', '-d', default='cpu')
+def weight_norm(config_path, frames, repeats, device):
+    """Per-sentence vocoder time with and without folded weight norm."""
+    model, hps = build_model(config_path, device)
+    z = torch.randn(1, model.inter_channels, frames, device=device)
+    g = torch.randn(1, model.gin_channels, 1, device=device)
+    seconds = frames * hps.data.hop_length / hps.data.sampling_rate
+
+    with torch.no_grad():
+        reference = model.dec(z, g=g)
+        before = timeit(lambda: model.dec(z, g=g), repeats)
+        model.remove_weight_norm()
+        folded = model.dec(z, g=g)
+        after = timeit(lambda: model.dec(z, g=g), repeats)
+
+    print(f"{frames} frames ({seconds:.2f} s of audio), {repeats} runs on {device}")
+    print(f"weight norm:   {before * 1000:.1f} ms/sentence")
+    print(f"folded:        {after * 1000:.1f} ms/sentence")
+    print(f"speedup:       {before / after:.2f}x")
+    print(f"max abs diff:  {(reference - folded).abs().max().item():.2e}")
+
+
+@main.command('duration')
+@click.option('--config_path', '-c', default='configs/config.json', help="Model config")
+@click.option('--phones', '-p', default=100, help="Phones per sentence")
+@click.option('--repeats', '-r', default=20)
+@click.option('--device', '-d', default='cpu')
+def duration(config_path, phones, repeats, device):
+    """Per-sentence duration prediction time for each sdp_ratio case."""
+    model, hps = build_model(config_path, device)
+    x = torch.randint(0, model.n_vocab, (1, phones), device=device)
+    x_lengths = torch.LongTensor([phones]).to(device)
+    zeros = torch.zeros(1, phones, dtype=torch.long, device=device)
+    bert = torch.zeros(1, 1024, phones, device=device)
+    ja_bert = torch.zeros(1, 768, phones, device=device)
+    g = model.emb_g(torch.LongTensor([0]).to(device)).unsqueeze(-1)
+
+    with torch.no_grad():
+        h, _, _, x_mask = model.enc_p(x, x_lengths, zeros, zeros, bert, ja_bert, g=g)
+        both = timeit(lambda: model.predict_logw(h, x_mask, g=g, sdp_ratio=0.5), repeats)
+        dp_only = timeit(lambda: model.predict_logw(h, x_mask, g=g, sdp_ratio=0), repeats)
+        sdp_only = timeit(lambda: model.predict_logw(h, x_mask, g=g, sdp_ratio=1), repeats)
+
+    print(f"{phones} phones, {repeats} runs on {device}")
+    print(f"sdp + dp:      {both * 1000:.2f} ms/sentence")
+    print(f"sdp_ratio=0:   {dp_only * 1000:.2f} ms/sentence (saves {(both - dp_only) * 1000:.2f} ms)")
+    print(f"sdp_ratio=1:   {sdp_only * 1000:.2f} ms/sentence (saves {(both - sdp_only) * 1000:.2f} ms)")
+
+
+@main.command('workers')
+@click.option('--language', '-l', default='EN')
+@click.option('--max_workers', '-n', default=4, help="Largest worker count, doubling from 1")
+@click.option('--threads_per_worker', '-t', default=1)
+@click.option('--sentences', '-s', default=32, help="Sentences per run")
+def workers(language, max_workers, threads_per_worker, sentences):
+    """CPU throughput of TTSWorkerPool from 1 to max_workers processes."""
+    from api import TTS
+    from worker_pool import TTSWorkerPool
+    tts = TTS(language=language, device='cpu')
+    speaker_id = list(tts.hps.data.spk2id.values())[0]
+    texts = ['The field of text-to-speech has seen rapid development recently.'] * sentences
+    sr = tts.hps.data.sampling_rate
+
+    n = 1
+    while n <= max_workers:
+        with TTSWorkerPool(language, n_workers=n, threads_per_worker=threads_per_worker, tts=tts) as pool:
+            pool.map(texts[:n], speaker_id)  # fork and warm up every worker
+            start = time.perf_counter()
+            audio_list = pool.map(texts, speaker_id)
+            elapsed = time.perf_counter() - start
+        audio_seconds = sum(audio.size for audio in audio_list) / sr
+        print(f"{n:3d} workers x {threads_per_worker} threads: {sentences / elapsed:6.2f} sentences/s, {audio_seconds / elapsed:6.1f} s of audio/s, {memory_usage()['VmRSS']:.0f} MB parent RSS")
+        n *= 2
+
+
+@main.command('threads')
+@click.option('--language', '-l', default='EN')
+@click.option('--max_threads', '-n', default=None, type=int, help="Largest thread count, defaults to the usable cores")
+@click.option('--repeats', '-r', default=3)
+def threads(language, max_threads, repeats):
+    """Real-time factor on CPU versus intra-op thread count."""
+    import os
+    from api import TTS
+    tts = TTS(language=language, device='cpu')
+    speaker_id = list(tts.hps.data.spk2id.values())[0]
+    text = 'The field of text-to-speech has seen rapid development recently. Did you ever hear a folk tale about a giant turtle?'
+    items = tts.get_text_inputs(tts.split_sentences_into_pieces(text, tts.language, quiet=True))
+    audio_seconds = sum(tts.infer_text_inputs(item, speaker_id).size for item in items) / tts.hps.data.sampling_rate
+    max_threads = max_threads or len(os.sched_getaffinity(0))
+
+    counts = sorted({1, 2, 4, 8, 16, 32, 64, max_threads} & set(range(1, max_threads + 1)))
+    for n in counts:
+        torch.set_num_threads(n)
+        elapsed = timeit(lambda: [tts.infer_text_inputs(item, speaker_id) for item in items], repeats, warmup=1)
+        print(f"{n:3d} threads: rtf {elapsed / audio_seconds:.3f} ({elapsed * 1000:.0f} ms for {audio_seconds:.2f} s of audio)")
+
+
+@main.command('quantize')
+@click.option('--language', '-l', default='EN')
+@click.option('--repeats', '-r', default=3)
+@click.option('--seed', default=0, help="Same noise for both models")
+def quantize(language, repeats, seed):
+    """Speed and mel distance of quantize='int8' against fp32 on CPU."""
+    from api import TTS
+    tts = TTS(language=language, device='cpu')
+    speaker_id = list(tts.hps.data.spk2id.values())[0]
+    texts = [t for text in TEXTS for t in tts.split_sentences_into_pieces(text, tts.language, quiet=True)]
+
+    def synthesize(model, items):
+        generators = TTS.sentence_generators(seed, len(items))
+        return [model.infer_text_inputs(item, speaker_id, generator=generator) for item, generator in zip(items, generators)]
+
+    items = tts.get_text_inputs(texts)
+    frontend = timeit(lambda: tts.get_text_inputs(texts), repeats, warmup=1)
+    model = timeit(lambda: synthesize(tts, items), repeats, warmup=1)
+    reference = synthesize(tts, items)
+
+    tts_q = TTS(language=language, device='cpu', quantize='int8')
+    items_q = tts_q.get_text_inputs(texts)
+    frontend_q = timeit(lambda: tts_q.get_text_inputs(texts), repeats, warmup=1)
+    model_q = timeit(lambda: synthesize(tts_q, items), repeats, warmup=1)
+    # synthesizer alone on fp32 features, then the whole int8 pipeline
+    synth_q = synthesize(tts_q, items)
+    full_q = synthesize(tts_q, items_q)
+
+    audio_seconds = sum(a.size for a in reference) / tts.hps.data.sampling_rate
+    print(f"{len(texts)} sentences, {audio_seconds:.2f} s of audio, {torch.get_num_threads()} threads")
+    print(f"frontend     fp32 {frontend * 1000:7.0f} ms   int8 {frontend_q * 1000:7.0f} ms   {frontend / frontend_q:.2f}x")
+    print(f"synthesizer  fp32 {model * 1000:7.0f} ms   int8 {model_q * 1000:7.0f} ms   {model / model_q:.2f}x")
+    print(f"rtf          fp32 {(frontend + model) / audio_seconds:.3f}      int8 {(frontend_q + model_q) / audio_seconds:.3f}")
+    for label, outputs in (('int8 synthesizer', synth_q), ('int8 synthesizer + BERT', full_q)):
+        distances = [mel_distance(a, b, tts.hps) for a, b in zip(reference, outputs)]
+        lengths = [abs(a.size - b.size) / tts.hps.data.hop_length for a, b in zip(reference, outputs)]
+        print(f"{label:24s} log-mel L1 {np.mean(distances):.3f} (max {np.max(distances):.3f}), length diff {np.mean(lengths):.1f} frames")
+
+
+@main.command('precision')
+@click.option('--language', '-l', default='EN')
+@click.option('--dtype', default='bf16', type=click.Choice(['bf16', 'fp16']))
+@click.option('--device', '-d', default='cpu')
+@click.option('--seed', default=0, help="Same noise for both precisions")
+@click.option('--max_mel_l1', default=0.1, help="Fail above this mean log-mel L1 against fp32")
+@click.option('--repeats', '-r', default=3)
+def precision(language, dtype, device, seed, max_mel_l1, repeats):
+    """Speed and waveform deviation of TTS(dtype=...) against fp32; exits 1 past the bound."""
+    from api import TTS
+    tts = TTS(language=language, device=device)
+    speaker_id = list(tts.hps.data.spk2id.values())[0]
+    texts = [t for text in TEXTS for t in tts.split_sentences_into_pieces(text, tts.language, quiet=True)]
+    items = tts.get_text_inputs(texts)
+
+    def synthesize():
+        generators = TTS.sentence_generators(seed, len(items))
+        return [tts.infer_text_inputs(item, speaker_id, generator=generator) for item, generator in zip(items, generators)]
+
+    reference = synthesize()
+    fp32 = timeit(synthesize, repeats, warmup=1)
+    if dtype == 'bf16' and device == 'cpu':
+        from api import cpu_supports_bf16
+        if not cpu_supports_bf16():
+            print("note: no native bf16 on this CPU, TTS(dtype='bf16') rejects it")
+    tts.model.autocast_dtype = torch.bfloat16 if dtype == 'bf16' else torch.float16
+    outputs = synthesize()
+    reduced = timeit(synthesize, repeats, warmup=1)
+
+    distances = [mel_distance(a, b, tts.hps) for a, b in zip(reference, outputs)]
+    lengths = [a.size != b.size for a, b in zip(reference, outputs)]
+    frames = [min(a.size, b.size) for a, b in zip(reference, outputs)]
+    max_abs = max(np.abs(a.reshape(-1)[:n] - b.reshape(-1)[:n]).max() for a, b, n in zip(reference, outputs, frames))
+    print(f"{len(texts)} sentences on {device}")
+    print(f"fp32 {fp32 * 1000:.0f} ms, {dtype} {reduced * 1000:.0f} ms, {fp32 / reduced:.2f}x")
+    print(f"log-mel L1 {np.mean(distances):.4f} (max {np.max(distances):.4f}), max abs sample diff {max_abs:.4f}, {sum(lengths)} length changes")
+    if np.mean(distances) > max_mel_l1:
+        print(f"FAIL: {dtype} deviates from fp32 beyond the bound")
+        sys.exit(1)
+
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import api
+from text.cleaner import clean_text, language_module_names
+if {eager}:
+    import importlib
+    for name in set(language_module_names.values()):
+        importlib.import_module('text.' + name)
+clean_text('Hello world.', {language!r})
+print(time.perf_counter() - start)
+"""
+
+
+@main.command('startup')
+@click.option('--language', '-l', default='EN', help="Language whose frontend is used")
+@click.option('--repeats', '-r', default=3)
+def startup(language, repeats):
+    """Import-to-first-g2p time with lazy versus all-language frontends."""
+    for label, eager in (('all languages', True), ('lazy', False)):
+        script = STARTUP_SCRIPT.format(eager=eager, language=language)
+        times = [
+            float(subprocess.check_output([sys.executable, '-c', script]).decode().split()[-1])
+            for _ in range(repeats)
+        ]
+        print(f"{label:14s} {min(times):.2f} s (best of {repeats})")
+
+
+if __name__ == "__main__":
+    main()
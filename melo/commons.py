@@ -45,6 +45,28 @@ def rand_gumbel_like(x):
     return g
 
 
+def randn_per_item(size, lengths, generator=None, device=None, dtype=None):
+    """Standard normal noise of size [b, c, t], zero past lengths[i].
+
+    generator is a torch.Generator or a list with one per batch item. Each
+    item draws only its own lengths[i] frames, so a seeded item gets the
+    same noise whatever else is in the batch. Without a generator this is
+    plain torch.randn.
+    """
+    if generator is None:
+        return torch.randn(size, device=device, dtype=dtype)
+    b, c, t = size
+    if isinstance(generator, torch.Generator):
+        generator = [generator] * b
+    assert len(generator) == b, (len(generator), b)
+    noise = torch.zeros(size, device=device, dtype=dtype)
+    for i, gen in enumerate(generator):
+        length = min(int(lengths[i]), t)
+        n = torch.randn(c, length, generator=gen, device=gen.device)
+        noise[i, :, :length] = n.to(device=device, dtype=dtype)
+    return noise
+
+
 def slice_segments(x, ids_str, segment_size=4):
     ret = torch.zeros_like(x[:, :, :segment_size])
     for i in range(x.size(0)):
@@ -142,6 +164,23 @@ def generate_path(duration, mask):
     return path
 
 
+def expand_by_durations(x, duration, t_y):
+    """
+    x: [b, d, t_x]
+    duration: [b, 1, t_x], whole frames, zero on padding
+    returns [b, d, t_y], equal to matmul(generate_path(duration, mask), x)
+    """
+    b, d, t_x = x.shape
+    cum_duration = torch.cumsum(duration.squeeze(1).long(), -1)  # [b, t_x]
+    frames = torch.arange(t_y, device=x.device).unsqueeze(0).expand(b, -1).contiguous()
+    # phone i covers frames [cum_duration[i - 1], cum_duration[i])
+    index = torch.searchsorted(cum_duration, frames, right=True)
+    valid = frames < cum_duration[:, -1:]
+    index = index.clamp_max(t_x - 1)
+    out = torch.gather(x, 2, index.unsqueeze(1).expand(-1, d, -1))
+    return out * valid.unsqueeze(1).to(x.dtype)
+
+
 def clip_grad_value_(parameters, clip_value, norm_type=2):
     if isinstance(parameters, torch.Tensor):
         parameters = [parameters]
@@ -51,7 +51,7 @@ def load_or_download_config(locale, use_hf=True, config_path=None):
             config_path = cached_path(DOWNLOAD_CONFIG_URLS[language])
     return utils.get_hparams_from_file(config_path)
 
-def load_or_download_model(locale, device, use_hf=True, ckpt_path=None):
+def load_or_download_model(locale, device, use_hf=True, ckpt_path=None, mmap=False):
     if ckpt_path is None:
         language = locale.split('-')[0].upper()
         if use_hf:
@@ -60,7 +60,25 @@ def load_or_download_model(locale, device, use_hf=True, ckpt_path=None):
         else:
             assert language in DOWNLOAD_CKPT_URLS
             ckpt_path = cached_path(DOWNLOAD_CKPT_URLS[language])
+    if str(ckpt_path).endswith('.safetensors'):
+        return load_safetensors_checkpoint(ckpt_path, device)
+    if mmap and device == 'cpu':
+        checkpoint_dict = torch.load(ckpt_path, map_location=device, mmap=True)
+        checkpoint_dict['mmap'] = True
+        return checkpoint_dict
     return torch.load(ckpt_path, map_location=device)
 
+def load_safetensors_checkpoint(ckpt_path, device):
+    from safetensors import safe_open
+    from safetensors.torch import load_file
+    with safe_open(ckpt_path, framework='pt') as f:
+        metadata = f.metadata() or {}
+    return {
+        'model': load_file(ckpt_path, device=str(device)),
+        'inference_only': metadata.get('inference_only') == 'True',
+        'fp16': metadata.get('fp16') == 'True',
+        'mmap': device == 'cpu',
+    }
+
 def load_pretrain_model():
     return [cached_path(url) for url in PRETRAINED_MODELS.values()]
@@ -0,0 +1,23 @@
+import os
+import click
+from api import TTS
+import utils
+
+
+@click.command()
+@click.option('--ckpt_path', '-m', type=str, default=None, help="Path to the checkpoint file, downloads the pretrained model if empty")
+@click.option('--language', '-l', type=str, default="EN", help="Language of the model")
+@click.option('--output_path', '-o', type=str, required=True, help="Path to the exported inference checkpoint, a .safetensors path writes a memory-mappable file")
+@click.option('--fp16', is_flag=True, show_default=True, default=False, help="Store the weights in half precision")
+def main(ckpt_path, language, output_path, fp16):
+    config_path = None
+    if ckpt_path is not None:
+        config_path = os.path.join(os.path.dirname(ckpt_path), 'config.json')
+    model = TTS(language=language, device='cpu', config_path=config_path, ckpt_path=ckpt_path)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    utils.save_inference_checkpoint(model.model, output_path, fp16=fp16)
+    print(f"Saved inference checkpoint to {output_path} ({os.path.getsize(output_path) / 2**20:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
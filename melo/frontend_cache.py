@@ -0,0 +1,128 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+
+def symbols_hash(symbols):
+    return hashlib.sha1("\n".join(symbols).encode("utf-8")).hexdigest()[:16]
+
+
+class FrontendCache:
+    """Caches text frontend results (phones, tones, lang_ids, bert, ja_bert).
+
+    Entries are keyed by (language, symbol table hash, add_blank,
+    disable_bert, BERT model id, quantize, normalized text). The memory tier is an LRU bounded by
+    max_bytes. With cache_dir set, entries are also written as .npy shards
+    that are memory-mapped back on a memory miss, so they survive restarts
+    and are shared between processes.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(language, symbols_hash, add_blank, disable_bert, bert_model_id, quantize, norm_text):
+        raw = "\x1f".join([
+            language, symbols_hash, str(bool(add_blank)), str(bool(disable_bert)),
+            bert_model_id or "", str(quantize), norm_text,
+        ])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def entry_nbytes(entry):
+        return sum(t.element_size() * t.nelement() for t in entry)
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        entry = self.load(key)
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.insert(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        entry = tuple(t.detach().cpu() for t in entry)
+        with self.lock:
+            self.insert(key, entry)
+        self.save(key, entry)
+
+    def insert(self, key, entry):
+        if key in self.entries:
+            self.nbytes -= self.entry_nbytes(self.entries.pop(key))
+        size = self.entry_nbytes(entry)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = entry
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= self.entry_nbytes(evicted)
+
+    def shard_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def save(self, key, entry):
+        if self.cache_dir is None:
+            return
+        bert, ja_bert, phone, tone, language = entry
+        path = self.shard_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {
+            "bert": bert.float().numpy(),
+            "ja_bert": ja_bert.float().numpy(),
+            "ids": torch.stack([phone, tone, language]).numpy(),
+        }
+        # only the BERT stream the language uses is stored, the other is
+        # zeros; ids go last since their presence marks a complete entry
+        for name, array in arrays.items():
+            if name != "ids" and not array.any():
+                continue
+            tmp_path = f"{path}.{name}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, f"{path}.{name}.npy")
+
+    def load(self, key):
+        if self.cache_dir is None:
+            return None
+        path = self.shard_path(key)
+        if not os.path.exists(f"{path}.ids.npy"):
+            return None
+        ids = torch.from_numpy(np.load(f"{path}.ids.npy", mmap_mode="c"))
+        length = ids.size(1)
+        features = []
+        for name, channels in (("bert", 1024), ("ja_bert", 768)):
+            if os.path.exists(f"{path}.{name}.npy"):
+                features.append(torch.from_numpy(np.load(f"{path}.{name}.npy", mmap_mode="c")))
+            else:
+                features.append(torch.zeros(channels, length))
+        return features[0], features[1], ids[0], ids[1], ids[2]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "bytes": self.nbytes,
+            }
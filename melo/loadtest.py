@@ -0,0 +1,103 @@
+import json
+import time
+import random
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import numpy as np
+
+DEFAULT_TEXTS = [
+    'The field of text-to-speech has seen rapid development recently.',
+    'Did you ever hear a folk tale about a giant turtle?',
+    'Once upon a time there was a small village at the foot of a mountain. Every morning the baker opened his shop before sunrise.',
+    'Please call me back when you get this message.',
+]
+
+
+def request(url, text, speaker, stream):
+    body = {'text': text}
+    if speaker:
+        body['speaker'] = speaker
+    req = urllib.request.Request(
+        url + ('/stream' if stream else '/synthesize'),
+        data=json.dumps(body).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+    )
+    start = time.perf_counter()
+    first_byte = None
+    n_bytes = 0
+    with urllib.request.urlopen(req) as response:
+        sr = int(response.headers.get('X-Sample-Rate', 0))
+        while True:
+            chunk = response.read(8192)
+            if not chunk:
+                break
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+                if not stream:
+                    # 44 byte wav header, sample rate at offset 24
+                    sr = int.from_bytes(chunk[24:28], 'little')
+                    chunk = chunk[44:]
+            n_bytes += len(chunk)
+    elapsed = time.perf_counter() - start
+    if first_byte is None or n_bytes == 0 or not sr:
+        raise ValueError('empty response')
+    return elapsed, first_byte, n_bytes // 2, sr
+
+
+def try_request(url, text, speaker, stream):
+    """request(), or the error as a short string so one failure does not end the run."""
+    try:
+        return request(url, text, speaker, stream)
+    except urllib.error.HTTPError as e:
+        return f'HTTP {e.code}'
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        return f'{type(e).__name__}: {e}'
+
+
+@click.command()
+@click.option('--url', '-u', default='http://127.0.0.1:8888', help='Server started with server.py')
+@click.option('--requests', '-n', 'n_requests', default=50, help='Total requests')
+@click.option('--concurrency', '-c', default=4, help='Requests in flight')
+@click.option('--speaker', '-spk', default=None)
+@click.option('--text_file', '-f', default=None, help='One text per line, defaults to a few built-in sentences')
+@click.option('--stream', is_flag=True, default=False, help='Use /stream instead of /synthesize')
+def main(url, n_requests, concurrency, speaker, text_file, stream):
+    """Load test a local server; reports latency percentiles and real-time factor."""
+    texts = DEFAULT_TEXTS
+    if text_file:
+        with open(text_file) as f:
+            texts = [line.strip() for line in f if line.strip()]
+    url = url.rstrip('/')
+    with urllib.request.urlopen(url + '/health') as response:
+        health = json.load(response)
+    print(f"{url}: {health['language']}, {n_requests} requests, concurrency {concurrency}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            lambda _: try_request(url, random.choice(texts), speaker, stream), range(n_requests)
+        ))
+    wall = time.perf_counter() - start
+
+    errors = Counter(r for r in results if isinstance(r, str))
+    results = [r for r in results if not isinstance(r, str)]
+    if errors:
+        print(f"errors     {sum(errors.values())} of {n_requests}: " + ', '.join(f'{e} x{n}' for e, n in errors.most_common()))
+    if not results:
+        raise SystemExit('no request succeeded')
+
+    latencies = np.array([r[0] for r in results]) * 1000
+    first_bytes = np.array([r[1] for r in results]) * 1000
+    audio_seconds = np.array([r[2] / r[3] for r in results])
+    print(f"latency    p50 {np.percentile(latencies, 50):8.1f} ms  p95 {np.percentile(latencies, 95):8.1f} ms  p99 {np.percentile(latencies, 99):8.1f} ms")
+    if stream:
+        print(f"first byte p50 {np.percentile(first_bytes, 50):8.1f} ms  p95 {np.percentile(first_bytes, 95):8.1f} ms  p99 {np.percentile(first_bytes, 99):8.1f} ms")
+    print(f"rtf        {np.mean(latencies / 1000 / audio_seconds):.3f} per request, {wall / audio_seconds.sum():.3f} aggregate")
+    print(f"throughput {len(results) / wall:.2f} req/s, {audio_seconds.sum() / wall:.1f} s of audio per s")
+
+
+if __name__ == "__main__":
+    main()
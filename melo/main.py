@@ -11,7 +11,11 @@ import os
 @click.option('--speaker', '-spk', default='EN-Default', help='Speaker ID, only for English, leave empty for default, ignored if not English. If English, defaults to "EN-Default"', type=click.Choice(['EN-Default', 'EN-US', 'EN-BR', 'EN_INDIA', 'EN-AU']))
 @click.option('--speed', '-s', default=1.0, help='Speed, defaults to 1.0', type=float)
 @click.option('--device', '-d', default='auto', help='Device, defaults to auto')
-def main(text, file, output_path, language, speaker, speed, device):
+@click.option('--seed', default=None, help='Seed for reproducible output, defaults to random', type=int)
+@click.option('--threads', '-t', default=None, help='Intra-op CPU threads, defaults to torch\'s choice', type=int)
+@click.option('--interop_threads', default=None, help='Inter-op CPU threads', type=int)
+@click.option('--cpus', default=None, help='Pin to these CPU cores, e.g. "0-3,8"')
+def main(text, file, output_path, language, speaker, speed, device, seed, threads, interop_threads, cpus):
     if file:
         if not os.path.exists(text):
             raise FileNotFoundError(f'Trying to load text from file due to --file/-f flag, but file not found. Remove the --file/-f flag to pass a string.')
@@ -26,11 +30,11 @@ def main(text, file, output_path, language, speaker, speed, device):
     if (not language == 'EN') and speaker:
         warnings.warn('You specified a speaker but the language is English.')
     from api import TTS
-    model = TTS(language=language, device=device)
+    model = TTS(language=language, device=device, num_threads=threads, num_interop_threads=interop_threads, cpu_affinity=cpus)
     speaker_ids = model.hps.data.spk2id
     if language == 'EN':
         if not speaker: speaker = 'EN-Default'
         spkr = speaker_ids[speaker]
     else:
         spkr = speaker_ids[list(speaker_ids.keys())[0]]
-    model.tts_to_file(text, spkr, output_path, speed=speed)
+    model.tts_to_file(text, spkr, output_path, speed=speed, seed=seed)
@@ -0,0 +1,148 @@
+import gc
+import threading
+from collections import OrderedDict
+
+import torch
+
+from text import bert_model_id
+
+
+def model_nbytes(model):
+    tensors = []
+    for value in model.state_dict().values():
+        # dynamically quantized layers store packed (weight, bias) tuples
+        tensors.extend(value if isinstance(value, tuple) else [value])
+    return sum(t.element_size() * t.nelement() for t in tensors if torch.is_tensor(t))
+
+
+class ModelPool:
+    """Loads one TTS per language on first use and keeps the recently used ones.
+
+    At most max_models are resident, and with max_bytes set the weights of
+    the resident synthesizers plus their BERTs, each shared BERT counted
+    once, stay under that budget. A model's BERT is loaded along with it.
+    The least recently used model is evicted first, together with its BERT
+    unless another resident language shares it. Languages in hot are loaded in a
+    background thread on construction. factory builds the pooled object from
+    a language and defaults to TTS(language=language, **tts_kwargs); objects
+    wrapping a TTS as .tts, such as AsyncTTS, work too.
+    """
+
+    def __init__(self, max_models=2, max_bytes=None, hot=(), factory=None, **tts_kwargs):
+        if factory is None:
+            from api import TTS
+
+            def factory(language):
+                return TTS(language=language, **tts_kwargs)
+        self.factory = factory
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.models = OrderedDict()
+        self.nbytes = {}
+        # BERT checkpoint of each resident model, from the language its TTS
+        # resolved to (e.g. ZH -> ZH_MIX_EN), None with disable_bert
+        self.bert_ids = {}
+        self.bert_nbytes = {}
+        self.lock = threading.Lock()
+        self.loading = {}
+        self.loads = 0
+        self.evictions = 0
+        if hot:
+            self.prewarm(hot)
+
+    @staticmethod
+    def tts_of(obj):
+        return getattr(obj, 'tts', obj)
+
+    def get(self, language):
+        with self.lock:
+            if language in self.models:
+                self.models.move_to_end(language)
+                return self.models[language]
+            load_lock = self.loading.setdefault(language, threading.Lock())
+        # one load per language at a time, different languages load in parallel
+        with load_lock:
+            with self.lock:
+                if language in self.models:
+                    self.models.move_to_end(language)
+                    return self.models[language]
+            obj = self.factory(language)
+            model_id = self.bert_id(obj)
+            bert_nbytes = self.load_bert(obj, model_id)
+            with self.lock:
+                self.models[language] = obj
+                self.nbytes[language] = model_nbytes(self.tts_of(obj).model)
+                self.bert_ids[language] = model_id
+                if model_id is not None:
+                    self.bert_nbytes[model_id] = bert_nbytes
+                self.loads += 1
+                evicted = self.evict(keep=language)
+        self.release(evicted)
+        return obj
+
+    def bert_id(self, obj):
+        tts = self.tts_of(obj)
+        if getattr(tts.hps.data, 'disable_bert', False):
+            return None
+        return bert_model_id(tts.language)
+
+    @staticmethod
+    def load_bert(obj, model_id):
+        """Loads the BERT the model's frontend runs, returns the bytes of every copy of it."""
+        if model_id is None:
+            return 0
+        from text import bert_registry
+        tts = ModelPool.tts_of(obj)
+        bert_registry.preload(model_id, tts.device, getattr(tts, 'bert_dtype', None))
+        # unload drops every device/dtype copy of a model id, so count them all
+        return sum(model_nbytes(model) for key, model in list(bert_registry.feature_models.items()) if key[0] == model_id)
+
+    def resident_bytes(self):
+        bert_ids = set(self.bert_ids.values()) - {None}
+        return sum(self.nbytes.values()) + sum(self.bert_nbytes[model_id] for model_id in bert_ids)
+
+    def evict(self, keep):
+        evicted = []
+        while len(self.models) > 1 and (
+            len(self.models) > self.max_models
+            or (self.max_bytes is not None and self.resident_bytes() > self.max_bytes)
+        ):
+            language = next(iter(self.models))
+            if language == keep:
+                break
+            del self.models[language]
+            del self.nbytes[language]
+            evicted.append(self.bert_ids.pop(language))
+            self.evictions += 1
+        return evicted
+
+    def release(self, evicted):
+        """Unloads the BERTs of evicted models that no resident model shares."""
+        if not evicted:
+            return
+        from text import bert_registry
+        with self.lock:
+            resident = set(self.bert_ids.values())
+        for model_id in set(evicted) - resident - {None}:
+            bert_registry.unload(model_id)
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def prewarm(self, languages):
+        thread = threading.Thread(target=lambda: [self.get(language) for language in languages], name='tts-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    def resident(self):
+        with self.lock:
+            return list(self.models)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'resident': list(self.models),
+                'bytes': self.resident_bytes(),
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
@@ -1,4 +1,5 @@
 import math
+import contextlib
 import torch
 from torch import nn
 from torch.nn import functional as F
@@ -208,7 +209,7 @@ class StochasticDurationPredictor(nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, filter_channels, 1)
 
-    def forward(self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0):
+    def forward(self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0, generator=None):
         x = torch.detach(x)
         x = self.pre(x)
         if g is not None:
@@ -260,7 +261,11 @@ class StochasticDurationPredictor(nn.Module):
             flows = list(reversed(self.flows))
             flows = flows[:-2] + [flows[-1]]  # remove a useless vflow
             z = (
-                torch.randn(x.size(0), 2, x.size(2)).to(device=x.device, dtype=x.dtype)
+                commons.randn_per_item(
+                    (x.size(0), 2, x.size(2)),
+                    x_mask.sum([1, 2]),
+                    generator=generator,
+                ).to(device=x.device, dtype=x.dtype)
                 * noise_scale
             )
             for flow in flows:
@@ -526,24 +531,37 @@ class Generator(torch.nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, upsample_initial_channel, 1)
 
-    def forward(self, x, g=None):
+    def forward(self, x, g=None, x_mask=None):
+        # x_mask [b, 1, t] marks the real frames of a padded batch. The
+        # padding is zeroed again before every convolution, upsampling the
+        # mask along with x, so each item sees the same zero padding as in
+        # a batch of one and comes out the same
+        if x_mask is not None:
+            x = x * x_mask
         x = self.conv_pre(x)
         if g is not None:
             x = x + self.cond(g)
+        if x_mask is not None:
+            x = x * x_mask
 
         for i in range(self.num_upsamples):
             x = F.leaky_relu(x, modules.LRELU_SLOPE)
             x = self.ups[i](x)
+            if x_mask is not None:
+                x_mask = x_mask.repeat_interleave(self.ups[i].stride[0], dim=2)
+                x = x * x_mask
             xs = None
             for j in range(self.num_kernels):
                 if xs is None:
-                    xs = self.resblocks[i * self.num_kernels + j](x)
+                    xs = self.resblocks[i * self.num_kernels + j](x, x_mask)
                 else:
-                    xs += self.resblocks[i * self.num_kernels + j](x)
+                    xs += self.resblocks[i * self.num_kernels + j](x, x_mask)
             x = xs / self.num_kernels
         x = F.leaky_relu(x)
         x = self.conv_post(x)
         x = torch.tanh(x)
+        if x_mask is not None:
+            x = x * x_mask
 
         return x
 
@@ -554,6 +572,44 @@ class Generator(torch.nn.Module):
         for layer in self.resblocks:
             layer.remove_weight_norm()
 
+    def receptive_field(self):
+        """One-sided receptive field of the vocoder, in input frames."""
+        field = (self.conv_pre.kernel_size[0] - 1) // 2
+        rate = 1
+        for i in range(self.num_upsamples):
+            up = self.ups[i]
+            field += math.ceil(up.kernel_size[0] / up.stride[0]) / rate
+            rate *= up.stride[0]
+            # the convs of a resblock run in series, its kernels in parallel
+            field += max(
+                sum(
+                    (c.kernel_size[0] - 1) // 2 * c.dilation[0]
+                    for c in self.resblocks[i * self.num_kernels + j].modules()
+                    if isinstance(c, Conv1d)
+                )
+                for j in range(self.num_kernels)
+            ) / rate
+        field += (self.conv_post.kernel_size[0] - 1) // 2 / rate
+        return math.ceil(field)
+
+    def infer_chunks(self, x, g=None, chunk_size=64, context=None):
+        """Decodes x in windows of chunk_size frames, yielding each piece.
+
+        Every window is extended by `context` frames on both sides (the
+        receptive field by default) and the extra samples are trimmed, so
+        the concatenated pieces match a single full forward pass.
+        """
+        if context is None:
+            context = self.receptive_field()
+        hop_length = math.prod(up.stride[0] for up in self.ups)
+        t = x.size(2)
+        for start in range(0, t, chunk_size):
+            end = min(start + chunk_size, t)
+            left = min(context, start)
+            right = min(context, t - end)
+            o = self.forward(x[:, :, start - left : end + right], g=g)
+            yield o[:, :, left * hop_length : o.size(2) - right * hop_length]
+
 
 class DiscriminatorP(torch.nn.Module):
     def __init__(self, period, kernel_size=5, stride=3, use_spectral_norm=False):
@@ -904,9 +960,35 @@ class SynthesizerTrn(nn.Module):
         else:
             self.ref_enc = ReferenceEncoder(spec_channels, gin_channels, layernorm=norm_refenc)
         self.use_vc = use_vc
+        self.inference_only = False
+        self.weight_norm_removed = False
+        self.autocast_dtype = None
         self.trt_engine_path = None
         self.trt_engines = {}
 
+    def remove_weight_norm(self):
+        if self.weight_norm_removed:
+            return
+        self.dec.remove_weight_norm()
+        if isinstance(self.flow, ResidualCouplingBlock):
+            for flow in self.flow.flows:
+                if isinstance(flow, modules.ResidualCouplingLayer):
+                    flow.enc.remove_weight_norm()
+        if hasattr(self, "enc_q"):
+            self.enc_q.enc.remove_weight_norm()
+        if hasattr(self, "ref_enc"):
+            for conv in self.ref_enc.convs:
+                remove_weight_norm(conv)
+        self.weight_norm_removed = True
+
+    def strip_for_inference(self):
+        """Drops the training-only posterior encoder and folds weight norm."""
+        if self.inference_only:
+            return
+        del self.enc_q
+        self.remove_weight_norm()
+        self.inference_only = True
+
     def load_trt_engine(self, engine_paths):
         for engine_name in engine_paths:
             self.trt_engines[engine_name] = load_engine(
@@ -1021,6 +1103,59 @@ class SynthesizerTrn(nn.Module):
         sdp_ratio=0,
         y=None,
         g=None,
+        chunk_size=None,
+        generator=None,
+        return_attn=False,
+    ):
+        # generator: torch.Generator, or one per batch item, for the sdp and
+        # prior noise; seeded items come out the same batched or alone.
+        # attn is only built, and returned instead of None, with return_attn
+        z, y_lengths, y_mask, g, attn, (z_p, m_p, logs_p) = self.infer_latent(
+            x, x_lengths, sid, tone, language, bert, ja_bert,
+            noise_scale=noise_scale, length_scale=length_scale, noise_scale_w=noise_scale_w,
+            sdp_ratio=sdp_ratio, y=y, g=g, generator=generator, return_attn=return_attn,
+        )
+        with self.autocast(z.device):
+            o = self.decode(z * y_mask, y_lengths, g=g, max_len=max_len, chunk_size=chunk_size).float()
+        # print('max/min of o:', o.max(), o.min())
+        return o, attn, y_mask, (z, z_p, m_p, logs_p)
+
+    def infer_stream(self, x, x_lengths, sid, tone, language, bert, ja_bert, max_len=None, chunk_size=64, **kwargs):
+        """Like infer for a batch of one, but yields the waveform in pieces.
+
+        Everything up to the latent runs on the first next(); after that each
+        next() vocodes one window of chunk_size frames (see
+        Generator.infer_chunks), so playback can start before the rest of
+        the sentence is decoded. The pieces concatenate to infer's output.
+        """
+        assert x.size(0) == 1, "infer_stream decodes a single sentence"
+        z, _, y_mask, g, _, _ = self.infer_latent(x, x_lengths, sid, tone, language, bert, ja_bert, **kwargs)
+        pieces = self.dec.infer_chunks((z * y_mask)[:, :, :max_len], g=g, chunk_size=chunk_size)
+        while True:
+            # autocast is entered per window so it does not leak to the caller between yields
+            with self.autocast(z.device):
+                o = next(pieces, None)
+            if o is None:
+                return
+            yield o.float()
+
+    def infer_latent(
+        self,
+        x,
+        x_lengths,
+        sid,
+        tone,
+        language,
+        bert,
+        ja_bert,
+        noise_scale=0.667,
+        length_scale=1,
+        noise_scale_w=0.8,
+        sdp_ratio=0,
+        y=None,
+        g=None,
+        generator=None,
+        return_attn=False,
     ):
         # x, m_p, logs_p, x_mask = self.enc_p(x, x_lengths, tone, language, bert)
         # g = self.gst(y)
@@ -1033,12 +1168,15 @@ class SynthesizerTrn(nn.Module):
             g_p = None
         else:
             g_p = g
-        x, m_p, logs_p, x_mask = self.enc_p(
-            x, x_lengths, tone, language, bert, ja_bert, g=g_p
+        with self.autocast(x.device):
+            x, m_p, logs_p, x_mask = self.enc_p(
+                x, x_lengths, tone, language, bert, ja_bert, g=g_p
+            )
+        # durations (sdp splines, exp(logw)) and the prior stay in fp32
+        x, m_p, logs_p, x_mask = x.float(), m_p.float(), logs_p.float(), x_mask.float()
+        logw = self.predict_logw(
+            x, x_mask, g=g, sdp_ratio=sdp_ratio, noise_scale_w=noise_scale_w, generator=generator
         )
-        logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w) * (
-            sdp_ratio
-        ) + self.dp(x, x_mask, g=g) * (1 - sdp_ratio)
         w = torch.exp(logw) * x_mask * length_scale
         
         w_ceil = torch.ceil(w)
@@ -1046,21 +1184,69 @@ class SynthesizerTrn(nn.Module):
         y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, None), 1).to(
             x_mask.dtype
         )
-        attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
-        attn = commons.generate_path(w_ceil, attn_mask)
+        attn = None
+        if return_attn:
+            attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+            attn = commons.generate_path(w_ceil, attn_mask)
 
-        m_p = torch.matmul(attn.squeeze(1), m_p.transpose(1, 2)).transpose(
-            1, 2
-        )  # [b, t', t], [b, t, d] -> [b, d, t']
-        logs_p = torch.matmul(attn.squeeze(1), logs_p.transpose(1, 2)).transpose(
-            1, 2
-        )  # [b, t', t], [b, t, d] -> [b, d, t']
+        # index the phone of every frame instead of multiplying by the dense
+        # [b, 1, t', t] path
+        m_p = commons.expand_by_durations(m_p, w_ceil, y_mask.size(2))  # [b, d, t']
+        logs_p = commons.expand_by_durations(logs_p, w_ceil, y_mask.size(2))  # [b, d, t']
 
-        z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
-        z = self.flow(z_p, y_mask, g=g, reverse=True)
-        o = self.dec((z * y_mask)[:, :, :max_len], g=g)
-        # print('max/min of o:', o.max(), o.min())
-        return o, attn, y_mask, (z, z_p, m_p, logs_p)
+        noise = commons.randn_per_item(
+            m_p.size(), y_lengths, generator=generator, device=m_p.device, dtype=m_p.dtype
+        )
+        z_p = m_p + noise * torch.exp(logs_p) * noise_scale
+        with self.autocast(z_p.device):
+            z = self.flow(z_p, y_mask, g=g, reverse=True).float()
+        return z, y_lengths, y_mask, g, attn, (z_p, m_p, logs_p)
+
+    def autocast(self, device):
+        # enc_p, flow and dec run in autocast_dtype when it is set, see
+        # TTS(dtype=...)
+        if self.autocast_dtype is None:
+            return contextlib.nullcontext()
+        return torch.autocast(device.type, dtype=self.autocast_dtype)
+
+    def predict_logw(self, x, x_mask, g=None, sdp_ratio=0, noise_scale_w=0.8, generator=None):
+        # only run the duration predictors that get a nonzero weight
+        if sdp_ratio == 0:
+            return self.dp(x, x_mask, g=g)
+        logw_sdp = self.sdp(
+            x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w, generator=generator
+        )
+        if sdp_ratio == 1:
+            return logw_sdp
+        return logw_sdp * sdp_ratio + self.dp(x, x_mask, g=g) * (1 - sdp_ratio)
+
+    def decode(self, z, y_lengths, g=None, max_len=None, chunk_size=None):
+        # a padded batch runs through the vocoder at once with the padding
+        # masked out, so every waveform matches what a batch of one would
+        # have produced; chunked decoding goes item by item
+        if z.size(0) == 1:
+            if chunk_size:
+                return torch.cat(
+                    list(self.dec.infer_chunks(z[:, :, :max_len], g=g, chunk_size=chunk_size)), -1
+                )
+            return self.dec(z[:, :, :max_len], g=g)
+        if not chunk_size:
+            z = z[:, :, :max_len]
+            lengths = torch.clamp_max(y_lengths, z.size(2))
+            z_mask = commons.sequence_mask(lengths, z.size(2)).unsqueeze(1).to(z.dtype)
+            return self.dec(z, g=g, x_mask=z_mask)
+        outputs = []
+        for i in range(z.size(0)):
+            length = int(y_lengths[i])
+            if max_len is not None:
+                length = min(length, max_len)
+            g_i = g[i : i + 1] if g is not None else None
+            outputs.append(
+                self.decode(z[i : i + 1, :, :length], None, g=g_i, chunk_size=chunk_size)
+            )
+        total = max(o.size(-1) for o in outputs)
+        o = torch.cat([F.pad(o, (0, total - o.size(-1))) for o in outputs], 0)
+        return o
 
     def voice_conversion(self, y, y_lengths, sid_src, sid_tgt, tau=1.0):        
         g_src = sid_src
@@ -1087,6 +1273,8 @@ class SynthesizerTrn(nn.Module):
         sdp_ratio=0,
         y=None,
         g=None,
+        generator=None,
+        return_attn=False,
     ):
         device = x.device
 
@@ -1113,9 +1301,9 @@ class SynthesizerTrn(nn.Module):
         )
 
 
-        logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w) * (
-            sdp_ratio
-        ) + self.dp(x, x_mask, g=g) * (1 - sdp_ratio)
+        logw = self.predict_logw(
+            x, x_mask, g=g, sdp_ratio=sdp_ratio, noise_scale_w=noise_scale_w, generator=generator
+        )
 
         w = torch.exp(logw) * x_mask * length_scale
         
@@ -1127,17 +1315,20 @@ class SynthesizerTrn(nn.Module):
         y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, None), 1).to(
             x_mask.dtype
         )
-        attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
-        attn = commons.generate_path(w_ceil, attn_mask)
+        attn = None
+        if return_attn:
+            attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+            attn = commons.generate_path(w_ceil, attn_mask)
 
-        m_p = torch.matmul(attn.squeeze(1), m_p.transpose(1, 2)).transpose(
-            1, 2
-        )  # [b, t', t], [b, t, d] -> [b, d, t']
-        logs_p = torch.matmul(attn.squeeze(1), logs_p.transpose(1, 2)).transpose(
-            1, 2
-        )  # [b, t', t], [b, t, d] -> [b, d, t']
+        # index the phone of every frame instead of multiplying by the dense
+        # [b, 1, t', t] path
+        m_p = commons.expand_by_durations(m_p, w_ceil, y_mask.size(2))  # [b, d, t']
+        logs_p = commons.expand_by_durations(logs_p, w_ceil, y_mask.size(2))  # [b, d, t']
 
-        z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
+        noise = commons.randn_per_item(
+            m_p.size(), y_lengths, generator=generator, device=m_p.device, dtype=m_p.dtype
+        )
+        z_p = m_p + noise * torch.exp(logs_p) * noise_scale
 
 
         z = self.flow(z_p, y_mask, g=g, reverse=True)
@@ -498,15 +498,33 @@ class ConvFlow(nn.Module):
         )
         unnormalized_derivatives = h[..., 2 * self.num_bins :]
 
-        x1, logabsdet = piecewise_rational_quadratic_transform(
-            x1,
-            unnormalized_widths,
-            unnormalized_heights,
-            unnormalized_derivatives,
-            inverse=reverse,
-            tails="linear",
-            tail_bound=self.tail_bound,
+        spline_inputs = [x1, unnormalized_widths, unnormalized_heights, unnormalized_derivatives]
+        reduced = (
+            torch.is_autocast_enabled()
+            or torch.is_autocast_cpu_enabled()
+            or any(t.dtype != torch.float32 for t in spline_inputs)
         )
+        if reduced and not self.training:
+            # the spline searches bins and divides by bin sizes, keep it in
+            # fp32 under inference autocast (TTS(dtype=...))
+            with torch.autocast(x.device.type, enabled=False):
+                x1, logabsdet = piecewise_rational_quadratic_transform(
+                    *[t.float() for t in spline_inputs],
+                    inverse=reverse,
+                    tails="linear",
+                    tail_bound=self.tail_bound,
+                )
+            x0 = x0.float()
+        else:
+            x1, logabsdet = piecewise_rational_quadratic_transform(
+                x1,
+                unnormalized_widths,
+                unnormalized_heights,
+                unnormalized_derivatives,
+                inverse=reverse,
+                tails="linear",
+                tail_bound=self.tail_bound,
+            )
 
         x = torch.cat([x0, x1], 1) * x_mask
         logdet = torch.sum(logabsdet * x_mask, [1, 2])
@@ -0,0 +1,55 @@
+import torch
+from torch import nn
+
+
+class PointwiseLinear(nn.Module):
+    """A kernel-size-1 Conv1d as an nn.Linear over channels, so it can be quantized."""
+
+    def __init__(self, conv):
+        super().__init__()
+        self.linear = nn.Linear(conv.in_channels, conv.out_channels, bias=conv.bias is not None)
+        self.linear.weight = nn.Parameter(conv.weight.detach().squeeze(-1).clone())
+        if conv.bias is not None:
+            self.linear.bias = nn.Parameter(conv.bias.detach().clone())
+
+    def forward(self, x):
+        return self.linear(x.transpose(1, 2)).transpose(1, 2)
+
+
+def is_pointwise(module):
+    return (
+        type(module) is nn.Conv1d
+        and module.kernel_size == (1,)
+        and module.stride == (1,)
+        and module.dilation == (1,)
+        and module.groups == 1
+        and module.padding in [(0,), 'valid']
+        # weight norm still in place, see SynthesizerTrn.remove_weight_norm
+        and not hasattr(module, 'weight_g')
+    )
+
+
+def pointwise_to_linear(module):
+    """Replaces every pointwise Conv1d under module with a PointwiseLinear, in place."""
+    for name, child in module.named_children():
+        if is_pointwise(child):
+            setattr(module, name, PointwiseLinear(child))
+        else:
+            pointwise_to_linear(child)
+    return module
+
+
+def quantize_dynamic_int8(model, modules=('enc_p', 'flow')):
+    """Dynamic int8 quantization of the Linear and pointwise Conv1d layers of a SynthesizerTrn.
+
+    Only the text encoder and the flow are quantized by default. The
+    duration predictors feed exp(logw), and the Generator is all wide
+    convolutions that dynamic quantization does not cover, so they stay in
+    float. Convolutions with kernel_size > 1 (the FFN layers) stay float as
+    well. CPU only.
+    """
+    for name in modules:
+        submodule = getattr(model, name)
+        pointwise_to_linear(submodule)
+        torch.ao.quantization.quantize_dynamic(submodule, {nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
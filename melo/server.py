@@ -0,0 +1,191 @@
+import time
+import asyncio
+import struct
+import threading
+from typing import Optional
+from collections import deque
+
+import click
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from async_api import AsyncTTS
+from model_pool import ModelPool
+
+
+class SynthesisRequest(BaseModel):
+    text: str
+    language: Optional[str] = None
+    speaker: Optional[str] = None
+    speed: float = 1.0
+    sdp_ratio: float = 0.2
+    noise_scale: float = 0.6
+    noise_scale_w: float = 0.8
+    seed: Optional[int] = None
+    # /stream only: vocoder window in latent frames, None sends whole sentences
+    chunk_size: Optional[int] = None
+
+
+def wav_header(sr, n_samples):
+    """Header of a mono 16-bit PCM wav."""
+    data_size = n_samples * 2
+    return b''.join([
+        b'RIFF', struct.pack('<I', 36 + data_size), b'WAVE',
+        b'fmt ', struct.pack('<IHHIIHH', 16, 1, 1, sr, sr * 2, 2, 16),
+        b'data', struct.pack('<I', data_size),
+    ])
+
+
+def to_pcm16(audio):
+    return (np.clip(audio, -1., 1.) * 32767).astype('<i2').tobytes()
+
+
+class Metrics:
+    def __init__(self, history=1024):
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=history)
+        self.requests = 0
+        self.errors = 0
+        self.active = 0
+        self.audio_seconds = 0.
+        self.synthesis_seconds = 0.
+
+    def start(self):
+        with self.lock:
+            self.requests += 1
+            self.active += 1
+        return time.perf_counter()
+
+    def finish(self, start, audio_seconds=None):
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.active -= 1
+            if audio_seconds is None:
+                self.errors += 1
+                return
+            self.latencies.append(elapsed)
+            self.audio_seconds += audio_seconds
+            self.synthesis_seconds += elapsed
+
+    def summary(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'active': self.active,
+                'audio_seconds': self.audio_seconds,
+                'rtf': self.synthesis_seconds / self.audio_seconds if self.audio_seconds else 0.,
+                'latency_ms': {
+                    f'p{q}': float(np.percentile(latencies, q)) if len(latencies) else 0.
+                    for q in (50, 95, 99)
+                },
+            }
+
+
+def create_app(pool, default_language='EN'):
+    """HTTP API over a ModelPool of AsyncTTS, one per language.
+
+    POST /synthesize returns the whole utterance as a wav, POST /stream
+    sends 16-bit PCM as each sentence is ready (X-Sample-Rate header).
+    GET /health and GET /metrics report status and latency/RTF figures.
+    """
+    app = FastAPI(title='MeloTTS')
+    metrics = Metrics()
+
+    async def get_tts(language):
+        # loading a language blocks, keep it off the event loop
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(None, pool.get, language or default_language)
+        except KeyError:
+            raise HTTPException(status_code=400, detail=f'unsupported language {language!r}')
+
+    def speaker_id(tts, name):
+        spk2id = tts.tts.hps.data.spk2id
+        if name is None:
+            return spk2id[list(spk2id.keys())[0]]
+        if name not in spk2id:
+            raise HTTPException(status_code=400, detail=f'unknown speaker {name!r}, expected one of {list(spk2id.keys())}')
+        return spk2id[name]
+
+    def params(request):
+        return dict(
+            speed=request.speed,
+            sdp_ratio=request.sdp_ratio,
+            noise_scale=request.noise_scale,
+            noise_scale_w=request.noise_scale_w,
+            seed=request.seed,
+        )
+
+    @app.post('/synthesize')
+    async def synthesize(request: SynthesisRequest):
+        tts = await get_tts(request.language)
+        spk = speaker_id(tts, request.speaker)
+        sr = tts.tts.hps.data.sampling_rate
+        start = metrics.start()
+        audio_seconds = None
+        try:
+            audio = await tts.synthesize(request.text, spk, **params(request))
+            audio_seconds = len(audio) / sr
+        finally:
+            metrics.finish(start, audio_seconds)
+        return Response(wav_header(sr, len(audio)) + to_pcm16(audio), media_type='audio/wav')
+
+    @app.post('/stream')
+    async def stream(request: SynthesisRequest):
+        tts = await get_tts(request.language)
+        spk = speaker_id(tts, request.speaker)
+        sr = tts.tts.hps.data.sampling_rate
+
+        async def chunks():
+            start = metrics.start()
+            n_bytes = 0
+            audio_seconds = None
+            try:
+                async for chunk in tts.stream(request.text, spk, format='pcm16', chunk_size=request.chunk_size, **params(request)):
+                    n_bytes += len(chunk)
+                    yield chunk
+                audio_seconds = n_bytes / 2 / sr
+            finally:
+                metrics.finish(start, audio_seconds)
+
+        return StreamingResponse(chunks(), media_type='audio/L16', headers={'X-Sample-Rate': str(sr)})
+
+    @app.get('/health')
+    async def health():
+        return {'status': 'ok', 'language': default_language, 'resident': pool.resident()}
+
+    @app.get('/metrics')
+    async def get_metrics():
+        summary = metrics.summary()
+        summary['pool'] = pool.stats()
+        return summary
+
+    return app
+
+
+@click.command()
+@click.option('--language', '-l', default='EN', help='Default language, loaded at startup')
+@click.option('--device', '-d', default='auto', help='Device, defaults to auto')
+@click.option('--host', '-h', default='127.0.0.1')
+@click.option('--port', '-p', type=int, default=8888)
+@click.option('--workers', '-w', default=1, help='Synthesis threads')
+@click.option('--max_pending', default=64, help='Jobs handed to the synthesis threads at once, per language')
+@click.option('--max_models', default=2, help='Languages kept loaded')
+@click.option('--hot', multiple=True, help='Extra languages to load in the background at startup')
+def serve(language, device, host, port, workers, max_pending, max_models, hot):
+    pool = ModelPool(
+        max_models=max_models,
+        factory=lambda l: AsyncTTS(language=l, device=device, max_workers=workers, max_pending=max_pending),
+    )
+    pool.get(language)
+    pool.prewarm(hot)
+    uvicorn.run(create_app(pool, language), host=host, port=port)
+
+
+if __name__ == "__main__":
+    serve()
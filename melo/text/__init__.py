@@ -1,3 +1,7 @@
+import importlib
+
+import torch
+
 from .symbols import language_id_map, language_tone_start_map, symbols, punctuation  # noqa: F401
 
 
@@ -25,22 +29,83 @@ def cleaned_text_to_sequence(cleaned_text, tones, language, symbol_to_id=None):
     return phones, tones, lang_ids
 
 
-def get_bert(norm_text, word2ph, language, device):
-    from .vietnamese_bert import get_bert_feature as vi_bert
-    # from .vietnamese_south import get_bert_feature as vi_south_bert
-    # from .vietnamese_north import get_bert_feature as vi_north_bert
-    # from .vietnamese_central import get_bert_feature as vi_central_bert
-    from .chinese_bert import get_bert_feature as zh_bert
-    from .english_bert import get_bert_feature as en_bert
-    from .japanese_bert import get_bert_feature as jp_bert
-    from .chinese_mix import get_bert_feature as zh_mix_en_bert
-    from .spanish_bert import get_bert_feature as sp_bert
-    from .french_bert import get_bert_feature as fr_bert
-    from .korean import get_bert_feature as kr_bert
-    from .tagalog import get_bert_feature as tgl_bert
-
-    lang_bert_func_map = {"VI-SOUTH": vi_bert, "VI-NORTH": vi_bert, "VI-CENTRAL": vi_bert,
-                          "ZH": zh_bert, "EN": en_bert, "JP": jp_bert, 'ZH_MIX_EN': zh_mix_en_bert,
-                          'FR': fr_bert, 'SP': sp_bert, 'ES': sp_bert, "KR": kr_bert, "TGL": tgl_bert}
-    bert = lang_bert_func_map[language](norm_text, word2ph, device)
+def distribute_phone(n_phone, n_word):
+    phones_per_word = [0] * n_word
+    for task in range(n_phone):
+        min_tasks = min(phones_per_word)
+        min_index = phones_per_word.index(min_tasks)
+        phones_per_word[min_index] += 1
+    return phones_per_word
+
+
+def expand_word2ph(features, word2ph):
+    """Repeats token-level BERT features to phone level.
+
+    features: [t_tok, d] with word2ph a list of t_tok counts, returns [d, t_ph].
+    A padded batch [b, t_tok, d] with one word2ph list per item returns
+    a list of b tensors [d, t_ph_i].
+    """
+    if features.dim() == 2:
+        counts = torch.as_tensor(word2ph, dtype=torch.long, device=features.device)
+        return features[: len(word2ph)].repeat_interleave(counts, dim=0).T
+    b, t, d = features.shape
+    counts = torch.zeros(b, t, dtype=torch.long)
+    for i, item_word2ph in enumerate(word2ph):
+        counts[i, : len(item_word2ph)] = torch.as_tensor(item_word2ph, dtype=torch.long)
+    # padding tokens repeat zero times, so the items come out back to back
+    phone_level = features.reshape(b * t, d).repeat_interleave(
+        counts.reshape(-1).to(features.device), dim=0
+    )
+    return [x.T for x in phone_level.split(counts.sum(1).tolist(), dim=0)]
+
+
+# language -> (module, function), imported on first use so that only the
+# BERT frontends a process actually needs get loaded
+lang_bert_func_map = {"VI-SOUTH": ("vietnamese_bert", "get_bert_feature"),
+                      "VI-NORTH": ("vietnamese_bert", "get_bert_feature"),
+                      "VI-CENTRAL": ("vietnamese_bert", "get_bert_feature"),
+                      "ZH": ("chinese_bert", "get_bert_feature"),
+                      "EN": ("english_bert", "get_bert_feature"),
+                      "JP": ("japanese_bert", "get_bert_feature"),
+                      'ZH_MIX_EN': ("chinese_mix", "get_bert_feature"),
+                      'FR': ("french_bert", "get_bert_feature"),
+                      'SP': ("spanish_bert", "get_bert_feature"),
+                      'ES': ("spanish_bert", "get_bert_feature"),
+                      "KR": ("korean", "get_bert_feature"),
+                      "TGL": ("tagalog", "get_bert_feature")}
+
+
+def get_bert(norm_text, word2ph, language, device, dtype=None):
+    module_name, func_name = lang_bert_func_map[language]
+    bert_func = getattr(importlib.import_module("." + module_name, __name__), func_name)
+    bert = bert_func(norm_text, word2ph, device, dtype=dtype)
     return bert
+
+
+def get_bert_batch(norm_texts, word2phs, language, device, dtype=None):
+    """Phone-level BERT features of several sentences from one forward pass.
+
+    dtype picks the registry copy of the BERT, torch.qint8 for the int8 one.
+    """
+    module_name, func_name = lang_bert_func_map[language]
+    bert_func = getattr(importlib.import_module("." + module_name, __name__), func_name + "_batch")
+    berts = bert_func(norm_texts, word2phs, device, dtype=dtype)
+    return berts
+
+
+def bert_model_id(language):
+    module_name, _ = lang_bert_func_map[language]
+    return importlib.import_module("." + module_name, __name__).model_id
+
+
+def preload_bert(language, device=None, dtype=None):
+    from . import bert_registry
+    return bert_registry.preload(bert_model_id(language), device, dtype)
+
+
+def unload_bert(language=None, device=None, dtype=None):
+    from . import bert_registry
+    model_id = None
+    if language is not None:
+        model_id = bert_model_id(language)
+    bert_registry.unload(model_id, device, dtype)
@@ -0,0 +1,116 @@
+import sys
+import threading
+
+import torch
+from transformers import AutoConfig, AutoModel, AutoTokenizer
+
+# one copy of each BERT per process, shared by every language frontend;
+# the int8 copy is a separate entry with dtype torch.qint8
+feature_models = {}
+tokenizers = {}
+# the frontends use hidden_states[-3:-2] of the masked LM
+FEATURE_LAYER = -3
+# _lock only guards the dicts; loads hold a lock per entry, so a BERT
+# downloading for one language does not block the others
+_lock = threading.Lock()
+_load_locks = {}
+
+
+def resolve_device(device=None):
+    if (
+        sys.platform == "darwin"
+        and torch.backends.mps.is_available()
+        and device == "cpu"
+    ):
+        device = "mps"
+    if not device:
+        device = "cuda"
+    return device
+
+
+def model_key(model_id, device=None, dtype=None):
+    device = str(resolve_device(device))
+    if dtype is torch.qint8 and device != "cpu":
+        # on macOS the frontends run BERT on mps, which has no int8 kernels
+        dtype = None
+    return (model_id, device, dtype or torch.float32)
+
+
+def _get_or_load(cache, key, load):
+    with _lock:
+        if key in cache:
+            return cache[key]
+        load_lock = _load_locks.setdefault((id(cache), key), threading.Lock())
+    with load_lock:
+        with _lock:
+            if key in cache:
+                return cache[key]
+        value = load()
+        with _lock:
+            cache[key] = value
+        return value
+
+
+def get_tokenizer(model_id):
+    return _get_or_load(tokenizers, model_id, lambda: AutoTokenizer.from_pretrained(model_id))
+
+
+def get_feature_model(model_id, device=None, dtype=None, hidden_layer=FEATURE_LAYER):
+    """Encoder truncated at the layer whose hidden state the frontends keep.
+
+    Its last_hidden_state equals hidden_states[hidden_layer] of the full
+    masked LM, without running the layers above it or the LM head.
+    """
+    key = model_key(model_id, device, dtype) + (hidden_layer,)
+
+    def load():
+        config = AutoConfig.from_pretrained(model_id)
+        # hidden_states holds the embeddings plus one entry per layer
+        num_hidden_layers = config.num_hidden_layers + 1 + hidden_layer
+        model = AutoModel.from_pretrained(
+            model_id, num_hidden_layers=num_hidden_layers, add_pooling_layer=False
+        )
+        if key[2] is torch.qint8:
+            torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        else:
+            model = model.to(device=key[1], dtype=key[2])
+        return model.eval()
+
+    return _get_or_load(feature_models, key, load)
+
+
+def encode_batch(model_id, texts, device=None, dtype=None):
+    """Token features of a right-padded batch, [b, t_tok, d], and token counts."""
+    model = get_feature_model(model_id, device, dtype)
+    tokenizer = get_tokenizer(model_id)
+    with torch.no_grad():
+        inputs = tokenizer(texts, return_tensors="pt", padding=True)
+        lengths = inputs["attention_mask"].sum(1).tolist()
+        for i in inputs:
+            inputs[i] = inputs[i].to(device)
+        res = model(**inputs).last_hidden_state.cpu()
+    return res, lengths
+
+
+def preload(model_id, device=None, dtype=None):
+    get_tokenizer(model_id)
+    return get_feature_model(model_id, device, dtype)
+
+
+def unload(model_id=None, device=None, dtype=None):
+    """Drops cached models matching the given fields, all of them by default."""
+    with _lock:
+        for key in list(feature_models):
+            if model_id is not None and key[0] != model_id:
+                continue
+            if device is not None and key[1] != str(resolve_device(device)):
+                continue
+            if dtype is not None and key[2] != dtype:
+                continue
+            del feature_models[key]
+        if model_id is None:
+            tokenizers.clear()
+        elif not any(key[0] == model_id for key in feature_models):
+            tokenizers.pop(model_id, None)
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
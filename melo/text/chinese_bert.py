@@ -1,49 +1,31 @@
 import torch
-import sys
-from transformers import AutoTokenizer, AutoModelForMaskedLM
 
-
-# model_id = 'hfl/chinese-roberta-wwm-ext-large'
-local_path = "./bert/chinese-roberta-wwm-ext-large"
+from . import bert_registry, expand_word2ph
 
 
-tokenizers = {}
-models = {}
+local_path = "./bert/chinese-roberta-wwm-ext-large"
+model_id = 'hfl/chinese-roberta-wwm-ext-large'
 
-def get_bert_feature(text, word2ph, device=None, model_id='hfl/chinese-roberta-wwm-ext-large'):
-    if model_id not in models:
-        models[model_id] = AutoModelForMaskedLM.from_pretrained(
-            model_id
-        ).to(device)
-        tokenizers[model_id] = AutoTokenizer.from_pretrained(model_id)
-    model = models[model_id]
-    tokenizer = tokenizers[model_id]
 
-    if (
-        sys.platform == "darwin"
-        and torch.backends.mps.is_available()
-        and device == "cpu"
-    ):
-        device = "mps"
-    if not device:
-        device = "cuda"
+def get_bert_feature(text, word2ph, device=None, model_id=model_id, dtype=None):
+    device = bert_registry.resolve_device(device)
+    model = bert_registry.get_feature_model(model_id, device, dtype)
+    tokenizer = bert_registry.get_tokenizer(model_id)
 
     with torch.no_grad():
         inputs = tokenizer(text, return_tensors="pt")
         for i in inputs:
             inputs[i] = inputs[i].to(device)
-        res = model(**inputs, output_hidden_states=True)
-        res = torch.cat(res["hidden_states"][-3:-2], -1)[0].cpu()
+        res = model(**inputs).last_hidden_state[0].cpu()
     # import pdb; pdb.set_trace()
     # assert len(word2ph) == len(text) + 2
-    word2phone = word2ph
-    phone_level_feature = []
-    for i in range(len(word2phone)):
-        repeat_feature = res[i].repeat(word2phone[i], 1)
-        phone_level_feature.append(repeat_feature)
+    return expand_word2ph(res, word2ph)
 
-    phone_level_feature = torch.cat(phone_level_feature, dim=0)
-    return phone_level_feature.T
+
+def get_bert_feature_batch(texts, word2phs, device=None, model_id=model_id, dtype=None):
+    device = bert_registry.resolve_device(device)
+    res, lengths = bert_registry.encode_batch(model_id, texts, device, dtype)
+    return expand_word2ph(res, word2phs)
 
 
 if __name__ == "__main__":
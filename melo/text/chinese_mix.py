@@ -8,7 +8,7 @@ from pypinyin import lazy_pinyin, Style
 from .symbols import language_tone_start_map
 from .tone_sandhi import ToneSandhi
 from .english import g2p as g2p_en
-from transformers import AutoTokenizer
+from . import bert_registry
 
 punctuation = ["!", "?", "…", ",", ".", "'", "-"]
 current_file_path = os.path.dirname(__file__)
@@ -97,7 +97,7 @@ def _get_initials_finals(word):
     return initials, finals
 
 model_id = 'bert-base-multilingual-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+tokenizer = bert_registry.get_tokenizer(model_id)
 def _g2p(segments):
     phones_list = []
     tones_list = []
@@ -194,9 +194,13 @@ def text_normalize(text):
     return text
 
 
-def get_bert_feature(text, word2ph, device):
+def get_bert_feature(text, word2ph, device, dtype=None):
     from . import chinese_bert
-    return chinese_bert.get_bert_feature(text, word2ph, model_id='bert-base-multilingual-uncased', device=device)
+    return chinese_bert.get_bert_feature(text, word2ph, model_id='bert-base-multilingual-uncased', device=device, dtype=dtype)
+
+def get_bert_feature_batch(texts, word2phs, device, dtype=None):
+    from . import chinese_bert
+    return chinese_bert.get_bert_feature_batch(texts, word2phs, model_id='bert-base-multilingual-uncased', device=device, dtype=dtype)
 
 from .chinese import _g2p as _chinese_g2p
 def _g2p_v2(segments):
@@ -1,15 +1,38 @@
-from . import chinese, japanese, english, chinese_mix, korean, french, spanish, vietnamese_south, vietnamese_north, vietnamese_central, tagalog
 from . import cleaned_text_to_sequence, get_bert
 import copy
+import importlib
 
-language_module_map = {"VI-SOUTH": vietnamese_south, "VI-NORTH": vietnamese_north, "VI-CENTRAL": vietnamese_central,
-                       "ZH": chinese, "JP": japanese, "EN": english, 'ZH_MIX_EN': chinese_mix, 
-                       'KR': korean, 'FR': french, 'SP': spanish, 'ES': spanish, 'TGL': tagalog}
+# the language frontends build g2p models, tokenizers and dictionaries at
+# import time, so each one is only imported the first time it is used
+language_module_names = {"VI-SOUTH": "vietnamese_south", "VI-NORTH": "vietnamese_north", "VI-CENTRAL": "vietnamese_central",
+                         "ZH": "chinese", "JP": "japanese", "EN": "english", 'ZH_MIX_EN': "chinese_mix",
+                         'KR': "korean", 'FR': "french", 'SP': "spanish", 'ES': "spanish", 'TGL': "tagalog"}
 
 
-def clean_text(text, language):
+class LazyModuleMap(dict):
+    def __init__(self, module_names):
+        super().__init__()
+        self.module_names = module_names
+
+    def __missing__(self, language):
+        module = importlib.import_module("." + self.module_names[language], __package__)
+        self[language] = module
+        return module
+
+    def __contains__(self, language):
+        return language in self.module_names
+
+
+language_module_map = LazyModuleMap(language_module_names)
+
+
+def normalize_text(text, language):
+    return language_module_map[language].text_normalize(text)
+
+
+def clean_text(text, language, normalized=False):
     language_module = language_module_map[language]
-    norm_text = language_module.text_normalize(text)
+    norm_text = text if normalized else language_module.text_normalize(text)
     phones, tones, word2ph = language_module.g2p(norm_text)
     return norm_text, phones, tones, word2ph
 
@@ -1,39 +1,26 @@
 import torch
-from transformers import AutoTokenizer, AutoModelForMaskedLM
-import sys
+
+from . import bert_registry, expand_word2ph
 
 model_id = 'bert-base-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
-model = None
 
-def get_bert_feature(text, word2ph, device=None):
-    global model
-    if (
-        sys.platform == "darwin"
-        and torch.backends.mps.is_available()
-        and device == "cpu"
-    ):
-        device = "mps"
-    if not device:
-        device = "cuda"
-    if model is None:
-        model = AutoModelForMaskedLM.from_pretrained(model_id).to(
-            device
-        )
+def get_bert_feature(text, word2ph, device=None, dtype=None):
+    device = bert_registry.resolve_device(device)
+    model = bert_registry.get_feature_model(model_id, device, dtype)
+    tokenizer = bert_registry.get_tokenizer(model_id)
     with torch.no_grad():
         inputs = tokenizer(text, return_tensors="pt")
         for i in inputs:
             inputs[i] = inputs[i].to(device)
-        res = model(**inputs, output_hidden_states=True)
-        res = torch.cat(res["hidden_states"][-3:-2], -1)[0].cpu()
+        res = model(**inputs).last_hidden_state[0].cpu()
         
     assert inputs["input_ids"].shape[-1] == len(word2ph)
-    word2phone = word2ph
-    phone_level_feature = []
-    for i in range(len(word2phone)):
-        repeat_feature = res[i].repeat(word2phone[i], 1)
-        phone_level_feature.append(repeat_feature)
+    return expand_word2ph(res, word2ph)
 
-    phone_level_feature = torch.cat(phone_level_feature, dim=0)
 
-    return phone_level_feature.T
+def get_bert_feature_batch(texts, word2phs, device=None, dtype=None):
+    device = bert_registry.resolve_device(device)
+    res, lengths = bert_registry.encode_batch(model_id, texts, device, dtype)
+    for length, word2ph in zip(lengths, word2phs):
+        assert length == len(word2ph), f"{length}/{len(word2ph)}"
+    return expand_word2ph(res, word2phs)
@@ -3,7 +3,7 @@
 import re
 import unicodedata
 
-from transformers import AutoTokenizer
+from . import bert_registry
 
 from . import symbols
 punctuation = ["!", "?", "…", ",", ".", "'", "-"]
@@ -567,7 +567,7 @@ def distribute_phone(n_phone, n_word):
 # tokenizer = AutoTokenizer.from_pretrained('cl-tohoku/bert-base-japanese-v3')
 
 model_id = 'tohoku-nlp/bert-base-japanese-v3'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+tokenizer = bert_registry.get_tokenizer(model_id)
 def g2p(norm_text):
 
     tokenized = tokenizer.tokenize(norm_text)
@@ -3,7 +3,7 @@
 import re
 import unicodedata
 
-from transformers import AutoTokenizer
+from . import bert_registry
 
 from . import punctuation, symbols
 
@@ -92,7 +92,7 @@ def distribute_phone(n_phone, n_word):
 # tokenizer = AutoTokenizer.from_pretrained('cl-tohoku/bert-base-japanese-v3')
 
 model_id = 'kykim/bert-kor-base'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+tokenizer = bert_registry.get_tokenizer(model_id)
 
 def g2p(norm_text):
     tokenized = tokenizer.tokenize(norm_text)
@@ -138,9 +138,13 @@ def g2p(norm_text):
     assert len(word2ph) == len(tokenized) + 2
     return phones, tones, word2ph
 
-def get_bert_feature(text, word2ph, device='cuda'):
+def get_bert_feature(text, word2ph, device='cuda', dtype=None):
     from . import japanese_bert
-    return japanese_bert.get_bert_feature(text, word2ph, device=device, model_id=model_id)
+    return japanese_bert.get_bert_feature(text, word2ph, device=device, model_id=model_id, dtype=dtype)
+
+def get_bert_feature_batch(texts, word2phs, device='cuda', dtype=None):
+    from . import japanese_bert
+    return japanese_bert.get_bert_feature_batch(texts, word2phs, device=device, model_id=model_id, dtype=dtype)
 
 
 if __name__ == "__main__":
@@ -8,9 +8,9 @@ from . import symbols
 from .english_utils.abbreviations import expand_abbreviations
 from .english_utils.time_norm import expand_time_english
 from .english_utils.number_norm import normalize_numbers
-from .japanese import distribute_phone
 
-from transformers import AutoTokenizer
+from . import bert_registry
+from . import distribute_phone
 
 current_file_path = os.path.dirname(__file__)
 TGL_FIL_DICT_PATH = os.path.join(current_file_path, "language_cmudict/tgl_fil_phones.csv")
@@ -18,6 +18,7 @@ TGL_ENG_DICT_PATH = os.path.join(current_file_path, "language_cmudict/tgl_eng_ph
 CACHE_PATH = os.path.join(current_file_path, "language_cmudict/tgl_cache.pickle")
 _g2p = G2p()
 
+
 def post_replace_ph(ph):
     rep_map = {
         "：": ",",
@@ -100,7 +101,7 @@ def text_normalize(text):
 
 # model_id = 'bert-base-uncased'
 model_id = 'google-bert/bert-base-multilingual-cased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+tokenizer = bert_registry.get_tokenizer(model_id)
 
 def g2p(text, pad_start_end=True, tokenized=None):
     if tokenized is None:
@@ -143,10 +144,15 @@ def g2p(text, pad_start_end=True, tokenized=None):
         word2ph = [1] + word2ph + [1]
     return phones, tones, word2ph
 
-def get_bert_feature(text, word2ph, device=None):
+def get_bert_feature(text, word2ph, device=None, dtype=None):
+    from text import tagalog_bert
+
+    return tagalog_bert.get_bert_feature(text, word2ph, device=device, dtype=dtype)
+
+def get_bert_feature_batch(texts, word2phs, device=None, dtype=None):
     from text import tagalog_bert
 
-    return tagalog_bert.get_bert_feature(text, word2ph, device=device)
+    return tagalog_bert.get_bert_feature_batch(texts, word2phs, device=device, dtype=dtype)
 
 if __name__ == "__main__":
     # print(get_dict())
@@ -5,10 +5,10 @@ from .vietnamese_utils.g2p import (
     global_vi_phonemizer_central as global_vi_phonemizer,
 )
 from phonemizer.separator import Separator
-from transformers import AutoTokenizer
+from . import bert_registry
+from . import distribute_phone
 
 from . import symbols
-from .japanese import distribute_phone
 from .vietnamese_utils.number_norm import normalize_numbers_vietnamese
 from .vietnamese_utils.time_norm import expand_time_vietnamese
 
@@ -82,7 +82,7 @@ def text_normalize(text):
 
 model_id = "google-bert/bert-base-multilingual-cased"
 # model_id = 'trituenhantaoio/bert-base-vietnamese-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+tokenizer = bert_registry.get_tokenizer(model_id)
 # tokenizer = BertTokenizer.from_pretrained(model_id)
 
 
@@ -9,7 +9,7 @@ from scipy.io.wavfile import read
 import torch
 import torchaudio
 import librosa
-from text import cleaned_text_to_sequence, get_bert
+from text import cleaned_text_to_sequence, get_bert, get_bert_batch
 from text.cleaner import clean_text
 import commons
 
@@ -19,8 +19,8 @@ logger = logging.getLogger(__name__)
 
 
 
-def get_text_for_tts_infer(text, language_str, hps, device, symbol_to_id=None):
-    norm_text, phone, tone, word2ph = clean_text(text, language_str)
+def clean_text_for_tts_infer(text, language_str, hps, symbol_to_id=None, normalized=False):
+    norm_text, phone, tone, word2ph = clean_text(text, language_str, normalized=normalized)
     phone, tone, language = cleaned_text_to_sequence(phone, tone, language_str, symbol_to_id)
 
     if hps.data.add_blank:
@@ -30,13 +30,14 @@ def get_text_for_tts_infer(text, language_str, hps, device, symbol_to_id=None):
         for i in range(len(word2ph)):
             word2ph[i] = word2ph[i] * 2
         word2ph[0] += 1
+    return norm_text, phone, tone, language, word2ph
 
-    if getattr(hps.data, "disable_bert", False):
+
+def pack_text_for_tts_infer(bert, phone, tone, language, language_str):
+    if bert is None:
         bert = torch.zeros(1024, len(phone))
         ja_bert = torch.zeros(768, len(phone))
     else:
-        bert = get_bert(norm_text, word2ph, language_str, device)
-        del word2ph
         assert bert.shape[-1] == len(phone), phone
 
         if language_str == "ZH":
@@ -57,6 +58,32 @@ def get_text_for_tts_infer(text, language_str, hps, device, symbol_to_id=None):
     language = torch.LongTensor(language)
     return bert, ja_bert, phone, tone, language
 
+
+def get_text_for_tts_infer(text, language_str, hps, device, symbol_to_id=None, bert_dtype=None):
+    norm_text, phone, tone, language, word2ph = clean_text_for_tts_infer(text, language_str, hps, symbol_to_id)
+
+    if getattr(hps.data, "disable_bert", False):
+        bert = None
+    else:
+        bert = get_bert(norm_text, word2ph, language_str, device, dtype=bert_dtype)
+        del word2ph
+    return pack_text_for_tts_infer(bert, phone, tone, language, language_str)
+
+
+def get_text_for_tts_infer_batch(texts, language_str, hps, device, symbol_to_id=None, normalized=False, bert_dtype=None):
+    cleaned = [clean_text_for_tts_infer(text, language_str, hps, symbol_to_id, normalized) for text in texts]
+
+    if getattr(hps.data, "disable_bert", False):
+        berts = [None] * len(cleaned)
+    else:
+        norm_texts = [item[0] for item in cleaned]
+        word2phs = [item[4] for item in cleaned]
+        berts = get_bert_batch(norm_texts, word2phs, language_str, device, dtype=bert_dtype)
+    return [
+        pack_text_for_tts_infer(bert, phone, tone, language, language_str)
+        for bert, (_, phone, tone, language, _) in zip(berts, cleaned)
+    ]
+
 def load_checkpoint(checkpoint_path, model, optimizer=None, skip_optimizer=False):
     assert os.path.isfile(checkpoint_path)
     checkpoint_dict = torch.load(checkpoint_path, map_location="cpu")
@@ -137,6 +164,37 @@ def save_checkpoint(model, optimizer, learning_rate, iteration, checkpoint_path)
     )
 
 
+def save_inference_checkpoint(model, checkpoint_path, fp16=False):
+    logger.info("Saving inference checkpoint to {}".format(checkpoint_path))
+    if hasattr(model, "module"):
+        model = model.module
+    model.strip_for_inference()
+    state_dict = model.state_dict()
+    if fp16:
+        state_dict = {
+            k: v.half() if v.is_floating_point() else v for k, v in state_dict.items()
+        }
+    if checkpoint_path.endswith(".safetensors"):
+        from safetensors.torch import save_file
+
+        # safetensors refuses tensors that share storage, e.g. shared flows
+        state_dict = {k: v.detach().cpu().contiguous().clone() for k, v in state_dict.items()}
+        save_file(
+            state_dict,
+            checkpoint_path,
+            metadata={"inference_only": "True", "fp16": str(fp16)},
+        )
+        return
+    torch.save(
+        {
+            "model": state_dict,
+            "inference_only": True,
+            "fp16": fp16,
+        },
+        checkpoint_path,
+    )
+
+
 def summarize(
     writer,
     global_step,
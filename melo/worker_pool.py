@@ -0,0 +1,71 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from api import TTS, configure_threads
+from text import bert_model_id
+from text import bert_registry
+
+# the TTS a forked worker inherited from the parent, set by _init_worker
+_worker_tts = None
+
+
+def _init_worker(tts, num_threads):
+    global _worker_tts
+    _worker_tts = tts
+    configure_threads(num_threads)
+
+
+def _infer_sentence(t, speaker_id, seed, kwargs):
+    generator = TTS.sentence_generators(seed, 1)[0]
+    return _worker_tts.infer_sentence(t, speaker_id, generator=generator, **kwargs)
+
+
+class TTSWorkerPool:
+    """Runs sentences in parallel in forked CPU worker processes.
+
+    The synthesizer and the language's BERT are loaded once in the parent
+    and moved to shared memory before forking. The workers map the same
+    pages instead of each holding a private copy, however the pages are
+    later touched. Each worker runs torch with threads_per_worker intra-op
+    threads, so n_workers * threads_per_worker should not exceed the
+    physical cores.
+    """
+
+    def __init__(self, language, n_workers=4, threads_per_worker=1, tts=None, **tts_kwargs):
+        if tts is None:
+            tts = TTS(language=language, device='cpu', **tts_kwargs)
+        assert tts.device == 'cpu', "shared-memory workers run on CPU"
+        self.tts = tts
+        tts.model.share_memory()
+        if not getattr(tts.hps.data, 'disable_bert', False):
+            bert_registry.preload(bert_model_id(tts.language), 'cpu', tts.bert_dtype).share_memory()
+        self.n_workers = n_workers
+        self.executor = ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker,
+            initargs=(tts, threads_per_worker),
+        )
+
+    def synthesize(self, text, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, seed=None, quiet=True):
+        """Same output as TTS.tts_to_file without an output path, one sentence per worker."""
+        texts = TTS.split_sentences_into_pieces(text, self.tts.language, quiet)
+        audio_list = self.map(texts, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, seed=seed)
+        return self.tts.audio_numpy_concat(audio_list, sr=self.tts.hps.data.sampling_rate, speed=speed)
+
+    def map(self, texts, speaker_id, seed=None, **kwargs):
+        """Waveform of every sentence in texts, in order."""
+        futures = [
+            self.executor.submit(_infer_sentence, t, speaker_id, None if seed is None else seed + i, kwargs)
+            for i, t in enumerate(texts)
+        ]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()